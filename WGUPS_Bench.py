@@ -0,0 +1,104 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# WGUPS_Bench.py:   Times the planner's main functions on generated days of growing size (50 to 50,000 packages by
+#                   default), and writes the scaling curve as JSON
+
+from WGUPS_Generator import City, make_manifest
+from WGUPS_Scenario import Scenario
+from WGUPS_Stats import Stats, default_timed
+from time import perf_counter
+from collections import Counter
+import argparse
+import platform
+import math
+import json
+
+default_sizes = (50, 500, 5000, 50000)
+truck_speed = 18.0      # mph, as in main.py
+day_hours = 2.0         # The hours the fleet should need to drive a day's estimated miles
+
+
+# The miles a generated day should take: a tour of every location (Beardwood-Halton-Hammersley, 0.7124 * sqrt(n * area),
+# stretched by the city's road factor) plus a round trip from the hub for every truckload; O(n)
+def estimate_miles(city, num_pkgs, max_packages):
+    tour = 0.7124 * math.sqrt((city.size - 1) * city.width * city.width) * city.road_factor
+    to_hub = sum(city.matrix[1:city.size]) / max(1, city.size - 1)
+    return tour + 2 * to_hub * -(-num_pkgs // max_packages)
+
+
+# Generates and runs one day of num_pkgs packages, returning its sizes, timings and results. The city has one location
+# for every two packages, up to max_locs (the distance table is n^2). Each truck can carry at least 4 times the average
+# packages per location (and the busiest location's packages), and there are enough trucks to drive the day's
+# estimated miles in day_hours. The city is only the map while its day runs; the map in use before is put back after.
+# A day that can't be finished is recorded with its error, along with the timings up to that point, and one with late
+# packages is recorded as not on time
+# Big-O: O(n^3)
+def run_size(num_pkgs, seed=0, max_locs=2000):
+    num_locs = min(num_pkgs // 2 + 1, max_locs)
+    per_loc = -(-num_pkgs // max(1, num_locs - 1))     # Packages per location, rounded up
+    record = {"packages": num_pkgs, "locations": num_locs, "seed": seed}
+
+    started = perf_counter()
+    city = City(num_locs, seed)
+    manifest = make_manifest(city, num_pkgs, seed)
+    record["generate_seconds"] = round(perf_counter() - started, 6)
+    busiest = max(Counter(row[1] for row in manifest).values(), default=0)
+    record["max_packages"] = max(16, 4 * per_loc, busiest)
+    record["estimated_miles"] = round(estimate_miles(city, num_pkgs, record["max_packages"]), 1)
+    record["trucks"] = max(2, math.ceil(record["estimated_miles"] / truck_speed / day_hours))
+
+    scenario = Scenario(num_trucks=record["trucks"], truck_speed=truck_speed, max_packages=record["max_packages"],
+                        manifest=manifest, strict=False, verbose=False, city=city)
+    stats = Stats()
+    started = perf_counter()
+    with city:
+        try:
+            stats.run(scenario)
+            record["results"] = scenario.results()
+            record["error"] = None
+            record["on_time"] = record["results"]["late_packages"] == 0 and record["results"]["undelivered"] == 0
+        except Exception as error:
+            record["results"] = None
+            record["error"] = type(error).__name__ + ": " + str(error)
+            record["on_time"] = False
+    record["total_seconds"] = round(perf_counter() - started, 6)
+    summary = stats.to_dict()
+    for field in ("phases", "functions", "counters", "chain_lengths"):
+        record[field] = summary[field]
+    return record
+
+
+# Runs every size in order, printing a line for each as it finishes. A size whose day failed, or wasn't delivered on
+# time, is flagged under its line: its timings are of a day the planner couldn't do, not a normal one; O(n^3)
+def run_bench(sizes=default_sizes, seed=0, max_locs=2000):
+    records = []
+    names = [name for cls, name in default_timed]
+    print("Packages\tLocs\tTrucks\tTotal s\t\t" + "\t".join(names))
+    for size in sizes:
+        record = run_size(size, seed, max_locs)
+        records.append(record)
+        print(record["packages"], record["locations"], record["trucks"], "%.3f" % record["total_seconds"], "",
+              *("%.3f" % record["functions"][name]["seconds"] for name in names), sep="\t")
+        if record["error"]:
+            print("\tfailed:", record["error"])
+        elif not record["on_time"]:
+            print("\tnot on time:", record["results"]["late_packages"], "late and", record["results"]["undelivered"],
+                  "undelivered packages, finishing after", record["results"]["makespan_hours"], "hours")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the WGUPS planner on generated days of growing size")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",") if size.strip()],
+                        default=list(default_sizes), help="package counts, e.g. 50,500,5000")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated cities and manifests")
+    parser.add_argument("--max-locations", type=int, default=2000, help="the most locations a generated city has")
+    parser.add_argument("--json", default="bench_results.json", help="file to write the results to")
+    args = parser.parse_args()
+
+    bench = run_bench(args.sizes, args.seed, args.max_locations)
+    with open(args.json, "w") as out:
+        json.dump({"python": platform.python_version(), "seed": args.seed, "max_locations": args.max_locations,
+                   "runs": bench}, out, indent=2)
+    print("Wrote", args.json)
@@ -0,0 +1,125 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# WGUPS_Generator.py:   Makes seeded, synthetic cities (locations and a distance table) and package manifests of any
+#                       size, for testing and benchmarking the planner beyond the Salt Lake City data
+
+from WGUPS_Objects import Map, Location, time_seconds
+from array import array
+import random
+import math
+import csv
+
+# Clock times that generated deadlines and delayed arrivals are picked from
+deadline_times = ("9:00 am", "9:30 am", "10:00 am", "10:30 am", "11:00 am", "12:00 pm", "1:00 pm", "2:00 pm")
+arrival_times = ("8:30 am", "9:05 am", "9:30 am", "10:00 am", "10:20 am", "11:00 am")
+
+
+# A synthetic city: location 0 is the hub, and the rest are random points in a width x width mile square. Distances are
+# the straight-line distance between points (so they're always a metric), scaled by road_factor for winding roads
+class City:
+    def __init__(self, num_locs, seed=0, width=10.0, road_factor=1.3):
+        rand = random.Random(seed)
+        self.size = num_locs
+        self.width = width
+        self.road_factor = road_factor
+        self.previous = []      # The maps in use before each "with" block, to put back when it ends
+        self.points = [(width / 2, width / 2)]      # The hub sits in the middle
+        for i in range(1, num_locs):
+            self.points.append((rand.uniform(0, width), rand.uniform(0, width)))
+        self.locations = [Location(0, "Hub", "1 Hub Way", "84000")]
+        for i in range(1, num_locs):
+            self.locations.append(Location(i, "Stop " + str(i), str(100 + i) + " Generated Ave",
+                                           "84" + str(i % 1000).zfill(3)))
+
+        # The full row-major distance matrix; O(n^2)
+        self.matrix = array('d', bytes(8 * num_locs * num_locs))
+        total = 0.0
+        for i in range(num_locs):
+            x1, y1 = self.points[i]
+            for j in range(i):
+                x2, y2 = self.points[j]
+                dist = round(math.hypot(x1 - x2, y1 - y2) * road_factor, 1) or 0.1
+                self.matrix[i * num_locs + j] = dist
+                self.matrix[j * num_locs + i] = dist
+                total += dist
+        self.avg_len = total / (num_locs * (num_locs - 1) / 2) if num_locs > 1 else 0.0
+
+    # Make this city the map that packages are looked up and routed on; O(n)
+    def use(self):
+        Map.set_matrix(self.matrix, self.size, self.avg_len)
+        Map.set_locations(self.locations)
+        return self
+
+    # "with City(...) as city:" uses the city for the block, then puts back the map that was in use before; O(n)
+    def __enter__(self):
+        self.previous.append(Map.save())
+        return self.use()
+
+    def __exit__(self, *exc_info):
+        Map.restore(self.previous.pop())
+
+    # Write the city as a distance table CSV (name, address, zip, then the lower triangle), which load_distance_file
+    # can read back; O(n^2)
+    def write(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("Name", "Address", "Zip", "Distances"))
+            for loc in self.locations:
+                row = self.matrix[loc.id * self.size:loc.id * self.size + loc.id + 1]
+                writer.writerow([loc.name, loc.address, loc.zip] + list(row))
+
+
+# A seeded package manifest for a city, as rows of PkgHashTable.insert arguments (id, address, city, zip, deadline,
+# mass, status). Each ratio is the share of packages that get that constraint: a deadline, a truck requirement, a
+# delayed arrival at the hub, or a place in the co-delivery cluster. Like the Salt Lake City data, the planner only
+# handles one required truck and one cluster, so every truck requirement names required_truck, and the clustered
+# packages form a single cluster of at most max_cluster packages. One truck can't carry a big city's share, so at most
+# max_required packages require it. A delayed package's deadline is always at least an hour after it arrives; O(n)
+def make_manifest(city, num_pkgs, seed=0, deadline_ratio=0.35, truck_ratio=0.1, delayed_ratio=0.1, cluster_ratio=0.1,
+                  required_truck=2, max_cluster=8, max_required=8):
+    rand = random.Random(seed)
+    if not 1 <= required_truck <= 9:
+        raise Exception("Truck requirements are written as one digit, can't require truck", required_truck)
+    cluster = set()
+    cluster_size = min(round(cluster_ratio * num_pkgs), max_cluster)
+    if cluster_size > 1:
+        cluster = set(rand.sample(range(1, num_pkgs + 1), cluster_size))
+
+    rows = []
+    required = 0
+    for id in range(1, num_pkgs + 1):
+        loc = city.locations[rand.randrange(1, city.size)]
+        deadline = rand.choice(deadline_times) if rand.random() < deadline_ratio else "EOD"
+        mass = rand.randint(1, 100)
+        status = "At Warehouse"
+        if id in cluster:
+            status = cluster - {id}
+            deadline = "EOD"    # Cluster members share one delivery, so they shouldn't pull it early
+        elif rand.random() < truck_ratio and required < max_required:
+            status = "Truck " + str(required_truck) + " Required"
+            required += 1
+        elif rand.random() < delayed_ratio:
+            status = rand.choice(arrival_times)
+            if deadline != "EOD" and time_seconds(deadline) < time_seconds(status) + 3600:
+                later = [time for time in deadline_times if time_seconds(time) >= time_seconds(status) + 3600]
+                deadline = rand.choice(later) if later else "EOD"
+        rows.append((id, loc.address, "Generated City", loc.zip, deadline, mass, status))
+    return rows
+
+
+# Write a manifest as a CSV with the columns load_pkg_file reads, putting each constraint in the notes column; O(n)
+def write_manifest(rows, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(("Package ID", "Address", "City", "Zip", "Delivery Deadline", "Mass KILO", "Special Notes"))
+        for id, address, city, zip, deadline, mass, status in rows:
+            if type(status) is set:
+                notes = "Must be delivered with " + ", ".join(str(other) for other in sorted(status))
+            elif status == "At Warehouse":
+                notes = ""
+            elif "Truck" in status:
+                notes = "Can only be on truck " + status[6]
+            else:
+                notes = "Delayed on flight---will not arrive to depot until " + status
+            writer.writerow((id, address, city, zip, deadline, mass, notes))
@@ -0,0 +1,407 @@
+# Author:           Wesley Lancaster
+# StudentID:        #001356953
+# Date:             September 2020
+# WGUPS_Loader.py:  Reads package manifests (XLSX, CSV or JSONL) and streams them into a PkgHashTable, and loads
+#                   distance tables into the Map through a memory-mapped binary cache
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+import zipfile
+from array import array
+from itertools import compress, islice
+from xml.etree.ElementTree import iterparse
+from WGUPS_Objects import Map, Location, time_seconds
+
+# Spreadsheet XML namespace, and a pattern that splits a cell reference like "AB12" into its column letters
+xlsx_ns = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+cell_ref = re.compile(r"([A-Z]+)")
+
+# Compiled parsers for the deadline and special notes columns
+clock_time = re.compile(r"(\d{1,2}):(\d{2})\s*([ap])\.?m", re.IGNORECASE)
+truck_note = re.compile(r"truck\s*(\d+)", re.IGNORECASE)
+with_note = re.compile(r"delivered with\s*([\d,\s]+)", re.IGNORECASE)
+
+zip_code = re.compile(r"(\d{5})")
+
+# Header keywords for each column we need, in the order Package's constructor takes them
+columns = ("id", "address", "city", "zip", "deadline", "mass", "notes")
+
+# Package update types, and the fields each one takes after its time, type and package id
+update_fields = {"address": ("address", "zip"), "delay": ("arrives",), "cancel": ()}
+
+
+# Streams package rows from a manifest file into the hash table, a chunk at a time: each chunk is split into columns,
+# parsed a column at a time, and inserted in one batch. Returns the number of packages loaded, and prints the load rate
+# to standard error if report is True (so it never mixes with a report written to standard output)
+# Big-O: O(n)
+def load_pkg_file(pkgs, path, chunk_size=10000, report=True):
+    start = time.perf_counter()
+    index, rows = pkg_records(path)
+    count = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if chunk:
+            count += pkgs.insert_columns(*pkg_columns(chunk, index))
+        if len(chunk) < chunk_size:
+            break
+
+    if report:
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else float("inf")
+        print("Loaded", count, "packages from", path, "in", round(elapsed, 3), "s (" + str(round(rate)) + " rows/sec)",
+              file=sys.stderr)
+    return count
+
+
+# Opens a manifest, returning the position of each entry in columns within its rows, and an iterator over its rows
+# (as read, after the header). The file type is picked by its extension; O(1) until the rows are read
+def pkg_records(path):
+    lower = str(path).lower()
+    if lower.endswith(".xlsx"):
+        return header_records(xlsx_rows(path))
+    elif lower.endswith(".csv"):
+        return header_records(csv_rows(path))
+    elif lower.endswith(".jsonl") or lower.endswith(".ndjson"):
+        return tuple(range(len(columns))), jsonl_records(path)
+    raise Exception("Unsupported manifest type:", path)
+
+
+# Splits a chunk of manifest rows into the Package constructor's arguments (ids, addresses, cities, zips, deadlines,
+# masses, statuses), as one parsed tuple per column. Rows without an id are skipped; O(n)
+def pkg_columns(chunk, index):
+    cells = [tuple(row[i] if i < len(row) else "" for row in chunk) if i is not None else ("",) * len(chunk)
+             for i in index]
+    keep = [id not in ("", None) for id in cells[0]]
+    if not all(keep):
+        cells = [tuple(compress(column, keep)) for column in cells]
+    ids, addresses, cities, zips, deadlines, masses, notes = cells
+    return (tuple(map(parse_id, ids)), tuple(address.strip() for address in addresses),
+            tuple(city.strip() for city in cities), tuple(map(parse_zip, zips)), tuple(map(parse_deadline, deadlines)),
+            tuple(map(parse_number, masses)), tuple(map(parse_notes, notes)))
+
+
+# Finds the header row (the first one naming a package id and an address) and returns its index (see header_index),
+# with the rest of the rows left unread; O(h) for h rows up to the header
+def header_records(rows):
+    for row in rows:
+        index = header_index(row)
+        if index is not None:
+            return index, rows
+    raise Exception("No header row naming a package id and an address was found")
+
+
+# Returns the position of each entry in columns within a header row, or None if the row isn't a header
+def header_index(row):
+    names = [" ".join(str(cell).lower().split()) for cell in row]
+    index = []
+    for column in columns:
+        match = None
+        for i in range(len(names)):
+            name = names[i]
+            if column == "id":
+                found = name in ("id", "package id", "pkg id", "tracking number", "tracking")
+            else:
+                found = column in name
+            if found:
+                match = i
+                break
+        index.append(match)
+    if index[0] is None or index[1] is None:
+        return None
+    return index
+
+
+# Reads a JSON Lines manifest, one object per line, keyed by the names in columns (or common variants); O(n)
+def jsonl_records(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = {" ".join(key.lower().replace("_", " ").split()): value for key, value in json.loads(line).items()}
+            index = header_index(list(record.keys()))
+            if index is None:
+                raise Exception("Manifest line is missing an id or address:", line)
+            values = list(record.values())
+            yield [values[i] if i is not None else "" for i in index]
+
+
+# A generator of rows (lists of cell values) from a CSV file; O(n)
+def csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        yield from csv.reader(file)
+
+
+# A generator of rows (lists of cell values) from the first sheet of an XLSX workbook. The sheet's XML is streamed and
+# cleared as it's read, so only the shared strings table is held in memory; O(n)
+def xlsx_rows(path):
+    with zipfile.ZipFile(path) as book:
+        shared = []
+        if "xl/sharedStrings.xml" in book.namelist():
+            with book.open("xl/sharedStrings.xml") as file:
+                for event, elem in iterparse(file):
+                    if elem.tag == xlsx_ns + "si":
+                        shared.append("".join(t.text or "" for t in elem.iter(xlsx_ns + "t")))
+                        elem.clear()
+
+        sheet = sorted(name for name in book.namelist() if name.startswith("xl/worksheets/sheet"))[0]
+        with book.open(sheet) as file:
+            for event, elem in iterparse(file):
+                if elem.tag != xlsx_ns + "row":
+                    continue
+                row = []
+                for cell in elem.iter(xlsx_ns + "c"):
+                    col = column_number(cell_ref.match(cell.get("r")).group(1)) if cell.get("r") else len(row)
+                    while len(row) < col:
+                        row.append("")
+                    row.append(cell_value(cell, shared))
+                yield row
+                elem.clear()
+
+
+# Converts column letters to a 0-based number ("A" -> 0, "AB" -> 27)
+def column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number - 1
+
+
+# Returns the value of a sheet cell: a string for text cells, otherwise the raw number text
+def cell_value(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(xlsx_ns + "t"))
+    value = cell.find(xlsx_ns + "v")
+    if value is None or value.text is None:
+        return ""
+    if kind == "s":
+        return shared[int(value.text)]
+    return value.text
+
+
+# Package ids are ints when they look like one, otherwise they're kept as tracking number strings
+def parse_id(value):
+    value = str(value).strip()
+    try:
+        return int(float(value)) if float(value).is_integer() else value
+    except ValueError:
+        return value
+
+
+# Zips can come in as numbers ("84115.0"), keep them as 5 digit strings
+def parse_zip(value):
+    value = str(value).strip()
+    if value.endswith(".0"):
+        value = value[:-2]
+    return value
+
+
+def parse_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+# Converts a deadline cell into seconds after midnight, or None for "EOD" (or anything else that isn't a time), which is
+# what the Package constructor takes. Spreadsheets store times as a fraction of a day (0.4375 is 10:30 am)
+def parse_deadline(value):
+    value = str(value).strip()
+    match = clock_time.search(value)
+    if match:
+        hour = int(match.group(1)) % 12 + (12 if match.group(3) in "pP" else 0)
+        return hour * 3600 + int(match.group(2)) * 60
+    try:
+        fraction = float(value)
+    except ValueError:
+        return None
+    return round(fraction * 24 * 60) * 60
+
+
+# Converts a special notes cell into the status the Package constructor takes: "Truck N Required" for a truck
+# requirement, "9:05 am" for a delayed package, a set of ids for packages that must go together, and "At Warehouse"
+# for anything else
+def parse_notes(value):
+    value = str(value or "").strip()
+    match = truck_note.search(value)
+    if match:
+        return "Truck " + match.group(1) + " Required"
+    match = clock_time.search(value)
+    if match:
+        return match.group(1) + ":" + match.group(2) + " " + match.group(3).lower() + "m"
+    match = with_note.search(value)
+    if match:
+        return {parse_id(id) for id in match.group(1).replace(",", " ").split()}
+    return "At Warehouse"
+
+
+# * * * * *   Distance Tables   * * * * * #
+# Loads a distance table (the WGUPS Distance Table XLSX, or a CSV) into the Map. The first time a given file is seen,
+# it's parsed and written to a cache as a raw float64 matrix plus a small JSON file of locations, both named after the
+# source file's hash. Every later run memory-maps the cached matrix instead, so startup doesn't depend on the table's
+# size and workers that load the same table share its pages. Returns the number of locations, and prints the load time
+# to standard error if report is True
+# Big-O: O(n^2) to parse the first time, O(n) from the cache
+def load_distance_file(path, cache_dir=None, report=True):
+    start = time.perf_counter()
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+    stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    cache = os.path.join(cache_dir, stem + "-" + file_digest(path)[:16] + "-" + sys.byteorder)
+
+    if os.path.exists(cache + ".f64") and os.path.exists(cache + ".json"):
+        with open(cache + ".json", encoding="utf-8") as file:
+            info = json.load(file)
+        locations = info["locations"]
+        matrix = map_matrix(cache + ".f64")
+        source = "cache"
+    else:
+        locations, matrix, total = parse_distance_table(path)
+        size = len(locations)
+        info = {"locations": locations, "avg_len": total / (size * (size - 1) / 2) if size > 1 else 0.0}
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomic(cache + ".f64", "wb", matrix.tofile)
+        write_atomic(cache + ".json", "w", lambda file: json.dump(info, file))
+        source = "source file"
+
+    Map.set_locations([Location(id, name, address, zip) for id, name, address, zip in locations])
+    Map.set_matrix(matrix, len(locations), info["avg_len"])
+
+    if report:
+        print("Loaded", len(locations), "locations from", path, "(" + source + ") in",
+              round(time.perf_counter() - start, 3), "s", file=sys.stderr)
+    return len(locations)
+
+
+# Returns the sha256 hex digest of a file, read in blocks; O(n)
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Memory-maps a raw float64 matrix file read-only. The mapping stays open as long as the returned view is used
+def map_matrix(path):
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mapped).cast('d')
+
+
+# Writes a file next to its final path and then renames it into place, so a reader never sees half a file
+def write_atomic(path, mode, write):
+    temp = path + "." + str(os.getpid()) + ".tmp"
+    with open(temp, mode) as file:
+        write(file)
+    os.replace(temp, path)
+
+
+# Parses a distance table into ([id, name, address, zip] for each location, full row-major matrix, sum of the edges).
+# Each location row holds the name/address cells followed by its distances (a lower triangle or a full row)
+# Big-O: O(n^2)
+def parse_distance_table(path):
+    if str(path).lower().endswith(".xlsx"):
+        rows = xlsx_distance_rows(path)
+    else:
+        rows = csv_distance_rows(path)
+    locations = []
+    table = []
+    for name, address, zip, distances in rows:
+        locations.append([len(locations), name, address, zip])
+        table.append(distances)
+
+    size = len(table)
+    matrix = array('d', bytes(8 * size * size))
+    total = 0.0
+    for i in range(size):
+        row = table[i]
+        for j in range(min(len(row), i + 1)):
+            matrix[i * size + j] = row[j]
+            matrix[j * size + i] = row[j]
+            total += row[j]
+    return locations, matrix, total
+
+
+# A generator of (name, address, zip, distances) from the WGUPS Distance Table sheet. Location rows start with their
+# number, then "Name\n Address", then " Address\n(zip)" (or " HUB", whose address and zip are in the name cell)
+def xlsx_distance_rows(path):
+    for row in xlsx_rows(path):
+        if len(row) < 4 or not row[0].strip().isdigit() or not row[1].strip():
+            continue
+        lines = [line.strip() for line in row[1].split("\n") if line.strip()]
+        name = lines[0]
+        address = lines[1].split(",")[0] if len(lines) > 1 else ""
+        if "(" in row[2]:
+            address = row[2].split("\n")[0].strip()
+        zips = zip_code.findall(row[2]) or zip_code.findall(row[1])
+        yield name, address, zips[-1] if zips else "", distance_values(row[3:])
+
+
+# A generator of (name, address, zip, distances) from a CSV with one location per row: name, address, zip, then the
+# distances. A header row (one whose distances aren't numbers) is skipped
+def csv_distance_rows(path):
+    for row in csv_rows(path):
+        if len(row) < 4:
+            continue
+        try:
+            float(row[3])
+        except ValueError:
+            continue
+        yield row[0].strip(), row[1].strip(), parse_zip(row[2]), distance_values(row[3:])
+
+
+# Converts the distance cells of a row to floats, stopping at the first empty cell (the end of a lower triangle)
+def distance_values(cells):
+    distances = []
+    for cell in cells:
+        if str(cell).strip() == "":
+            break
+        distances.append(round(float(cell), 10))     # Spreadsheets store 9.2 as 9.1999999999999993
+    return distances
+
+
+# * * * * *   Package Updates   * * * * * #
+# Reads a feed of mid-day package updates (a CSV with a header row, or JSONL) into the (time, type, pkg id, ...) tuples
+# that Scenario takes. Each row has a time ("10:20 am"), a type and a package id, plus the new address and zip for an
+# "address" correction, or the time the package arrives at the hub for a "delay". A "cancel" needs nothing else; O(n)
+def load_updates_file(path):
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file if line.strip()]
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            records = list(csv.DictReader(file))
+
+    updates = []
+    for record in records:
+        record = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+        kind = str(record.get("type", "")).strip().lower()
+        if kind not in update_fields:
+            raise Exception("Unknown package update", kind, "in", path)
+        update = [parse_clock(record.get("time")), kind, parse_id(record.get("package"))]
+        for field in update_fields[kind]:
+            if record.get(field) in (None, ""):
+                raise Exception("Package update is missing its", field, "in", path, ":", record)
+        if kind == "address":
+            update += [str(record["address"]).strip(), parse_zip(record["zip"])]
+        elif kind == "delay":
+            update.append(parse_clock(record["arrives"]))
+        updates.append(tuple(update))
+    return updates
+
+
+# Converts a time cell ("10:20 am", "14:05", or a spreadsheet's fraction of a day) into seconds after midnight
+def parse_clock(value):
+    value = str(value).strip()
+    seconds = time_seconds(value) if ":" in value else parse_deadline(value)
+    if seconds is None:
+        raise Exception("Not a time:", value)
+    return seconds
@@ -4,200 +4,762 @@
 # WGUPS_Objects.py: Defines all objects and classes (and related methods) necessary for the project
 
 from datetime import timedelta
+from array import array
+from functools import lru_cache
+from itertools import compress
+from bisect import bisect_right
+from collections import deque
+import csv
+import json
 
 
 # A class that represents a delivery truck, loads packages, drives, and delivers
 class Truck:
     # Ctor, start time at 8; O(1)
-    def __init__(self, id, speed, max_packages, start_time):
+    def __init__(self, id, speed, max_packages, start_time, strict=True, log=None):
         self.id = id
-        self.time = start_time  # start at 8 am
+        self.time = to_seconds(start_time)  # seconds after midnight, start at 8 am
         self.miles = 0.0
         self.speed = speed  # miles per hour
         self.max_packages = max_packages  # max amount of packages
         self.loc = 0  # current location
-        self.packages = []  # an ordered list of packages (which define the route)
+        self.packages = deque()  # an ordered queue of packages (which define the route)
+        self.strict = strict    # Raise on a late delivery, otherwise record it in late
+        self.late = []          # (pkg id, seconds late) for each late delivery when not strict
+        self.done_at = None     # When the truck finished its last route for the day
+        self.log = log          # A DeliveryLog that each delivery is added to, if any
+        self.travel = Map.travel_times(speed)   # Seconds to drive between any two locations at this speed
 
     # Drive the truck (adds time and mileage); O(1)
     def drive(self, location):
-        dist = Map.distances[self.loc][location]
+        self.miles += Map.distances[self.loc][location]
+        self.time += self.travel[self.loc][location]
         self.loc = location
-        self.miles += dist
-        elapsed = timedelta(hours=dist / self.speed)
-        self.time += elapsed
 
     # Loads the package onto the truck; O(1)
     def load(self, pkg):
         if len(self.packages) == self.max_packages:
             raise Exception("Truck cannot carry any more packages!")
         self.packages.append(pkg)
-        pkg.status = "On truck " + str(self.id)
+        pkg.load_on(self.id)
 
     # Unloads a package at its destination, ; O(1)
     def unload(self):
-        pkg = self.packages.pop(0)
-        pkg.status = "Delivered at " + str(self.time)
-        print("Truck", str(self.id), "delivered Pkg", str(pkg.id), "\tto Loc", pkg.loc,
-              "\tat", str(self.time), "\twith", round(self.miles, 1), "miles")
-        if pkg.deltime and pkg.deltime < self.time:
-            error = "Truck " + str(self.id) + " delivered pkg " + str(pkg.id) + " at " + str(self.time) + \
-                    ", it was due at " + str(pkg.deltime)
-            # print(error)
-            raise Exception(error)
+        pkg = self.packages.popleft()
+        pkg.deliver(self.time)
+        if self.log is not None:
+            self.log.append(self.id, pkg.id, pkg.loc, self.time, self.miles)
+        if pkg.deadline and pkg.deadline < self.time:
+            if self.strict:
+                error = "Truck " + str(self.id) + " delivered pkg " + str(pkg.id) + " at " + \
+                        str(timedelta(seconds=self.time)) + ", it was due at " + str(pkg.deltime)
+                raise Exception(error)
+            self.late.append((pkg.id, self.time - pkg.deadline))
         if pkg.truck and pkg.truck != self.id:
             raise Exception("Wrong truck delivered package", pkg.id, ", requires truck", pkg.truck)
 
     # Truck info in one string; O(1)
     def __str__(self):
-        return "Truck " + str(self.id) + " at " + str(self.time) + ": " + str(round(self.miles, 2)) + " miles"
+        return "Truck " + str(self.id) + " at " + str(timedelta(seconds=self.time)) + ": " + \
+            str(round(self.miles, 2)) + " miles"
 
 
-# A class that represents a Package needing to be delivered
+# Every delivery of the day, as columns (truck, pkg, loc, time in seconds, miles) that are allocated up front for the
+# expected amount of deliveries, and doubled if there are more. Nothing is formatted unless a sink is given, which is
+# called with each delivery as it's added (print_delivery shows it on the console)
+class DeliveryLog:
+    def __init__(self, capacity=64, sink=None):
+        capacity = max(capacity, 1)
+        self.size = 0
+        self.truck = array('h', bytes(2 * capacity))
+        self.pkg = array('q', bytes(8 * capacity))
+        self.loc = array('l', bytes(array('l').itemsize * capacity))
+        self.time = array('d', bytes(8 * capacity))
+        self.miles = array('d', bytes(8 * capacity))
+        self.sink = sink
+
+    # Add a delivery; O(1) amortized
+    def append(self, truck, pkg, loc, time, miles):
+        i = self.size
+        if i == len(self.pkg):
+            for column in (self.truck, self.pkg, self.loc, self.time, self.miles):
+                column.extend(column)
+        self.truck[i] = truck
+        self.pkg[i] = pkg
+        self.loc[i] = loc
+        self.time[i] = time
+        self.miles[i] = miles
+        self.size = i + 1
+        if self.sink is not None:
+            self.sink(truck, pkg, loc, time, miles)
+
+    def __len__(self):
+        return self.size
+
+    # Each delivery as a (truck, pkg, loc, time, miles) tuple, in the order they were made; O(n)
+    def __iter__(self):
+        n = self.size
+        return zip(self.truck[:n], self.pkg[:n], self.loc[:n], self.time[:n], self.miles[:n])
+
+
+# Print a delivery the way the simulation always has; O(1)
+def print_delivery(truck, pkg, loc, time, miles):
+    print("Truck", str(truck), "delivered Pkg", str(pkg), "\tto Loc", loc,
+          "\tat", str(timedelta(seconds=time)), "\twith", round(miles, 1), "miles")
+
+
+# A class that represents a Package needing to be delivered. Its data lives in a row of a PackageStore, so the object
+# itself is only a small view (store, index) with properties for each field
 class Package:
-    # Constructor; O(1)
-    def __init__(self, id, address, city, zip, deadline, mass, status):
-        self.id = id
-        self.mass = mass
-        self.status = status
-        self.truck = None
-        self.ready_at = None
-        self.cluster = None
+    __slots__ = ("store", "index")
+
+    # Constructor, appends a row to the given store (or a store of its own); O(1)
+    def __init__(self, id, address, city, zip, deadline, mass, status, store=None):
+        if store is None:
+            store = PackageStore()
+        self.store = store
+        truck = None
+        ready = 0
+        cluster = None
 
         # Assign a location id (for ease) and verify
-        self.loc = Map.lookup(address, zip)
-        if self.id != -1 & self.loc == -1:
+        loc = Map.lookup(address, zip)
+        if id != -1 & loc == -1:
             raise Exception("Unrecognized address!")
-        # print("Package", id, "goes to Location", self.loc)
+        # print("Package", id, "goes to Location", loc)
 
         # Assign a truck requirement for this package
         if status.__contains__("Truck"):
-            self.truck = int(status[6])
-            Map.locations[self.loc].truck = self.truck
+            truck = int(status[6])
+            Map.locations[loc].truck = truck
         elif status.__contains__(":"):
-            self.ready_at = get_time(status)
-            loc = Map.locations[self.loc]
-            if loc.ready_at:
-                loc.ready_at = max(loc.ready_at, self.ready_at)
-            else:
-                loc.ready_at = self.ready_at
+            ready = time_seconds(status) or 0
+            location = Map.locations[loc]
+            location.ready = max(location.ready, ready)
         elif type(status) is set:
-            self.cluster = []
+            cluster = []
             for i in status:
-                self.cluster.append(i)
-
-        # Parse deadline, which is in form "10:30 am" or "EOD" (end of day)
-        self.deltime = get_time(deadline)
-        Map.locations[self.loc].add_deltime(self.deltime)
-        # print("Pkg", self.id, "has deadline at", self.deltime)
+                cluster.append(i)
+
+        # Parse deadline, which is in form "10:30 am" or "EOD" (end of day), or already in seconds after midnight
+        deadline = time_seconds(deadline) if type(deadline) == str else deadline or None
+        self.index = store.append(id, loc, deadline, ready, truck, mass, status)
+        if cluster:
+            store.clusters[self.index] = cluster
+        Map.locations[loc].add_deadline(deadline)
+        # print("Pkg", id, "has deadline at", deadline)
+
+    @property
+    def id(self):
+        return self.store.ids[self.index]
+
+    @property
+    def loc(self):
+        loc = self.store.loc[self.index]
+        return None if loc == -1 else loc
+
+    @loc.setter
+    def loc(self, loc):
+        self.store.loc[self.index] = -1 if loc is None else loc
+        self.store.changed(self.index)
+
+    @property
+    def deltime(self):
+        return to_timedelta(self.store.deadline[self.index])
+
+    # The deadline in seconds (0 if none), for comparing without making a timedelta
+    @property
+    def deadline(self):
+        return self.store.deadline[self.index]
+
+    # When the package is at the hub, in seconds (0 if it's there at the start of the day)
+    @property
+    def ready(self):
+        return self.store.ready[self.index]
+
+    @ready.setter
+    def ready(self, ready):
+        self.store.ready[self.index] = ready
+
+    @property
+    def ready_at(self):
+        return to_timedelta(self.store.ready[self.index])
+
+    @ready_at.setter
+    def ready_at(self, ready_at):
+        self.store.ready[self.index] = to_seconds(ready_at)
+
+    @property
+    def truck(self):
+        return self.store.truck[self.index] or None
+
+    @property
+    def mass(self):
+        mass = self.store.mass[self.index]
+        return int(mass) if mass.is_integer() else mass
+
+    @property
+    def cluster(self):
+        return self.store.clusters.get(self.index)
+
+    @cluster.setter
+    def cluster(self, cluster):
+        self.store.clusters[self.index] = cluster
+
+    # The status is kept as a code (and an argument for it), and only made into a string when it's asked for
+    @property
+    def status(self):
+        return self.store.status_string(self.index)
+
+    @status.setter
+    def status(self, status):
+        self.store.set_status(self.index, status)
+        self.store.changed(self.index)
+
+    # Mark the package as loaded on a truck; O(1)
+    def load_on(self, truck_id):
+        self.store.status[self.index] = ON_TRUCK
+        self.store.status_arg[self.index] = truck_id
+        self.store.changed(self.index)
+
+    # Mark the package as delivered at a time (in seconds); O(1)
+    def deliver(self, time):
+        self.store.status[self.index] = DELIVERED
+        self.store.status_arg[self.index] = time
+        self.store.changed(self.index)
 
     # Simple to string; O(1)
     def __str__(self):
-        string = "Package #" + str(self.id) + ": " + self.status + " at location " + str(self.loc) + ". "
-        if self.deltime:
-            string += "\tRequired delivery time at " + str(self.deltime) + "."
-        if self.cluster:
-            string += "\tClustered with packages " + str(self.cluster)
+        return self.store.row_string(self.index)
+
+
+# Status codes for packages in a PackageStore
+AT_HUB = 0          # "At Warehouse"
+NOTED = 1           # Still showing the special note it came with ("Truck 2 Required", "9:05 am", ...)
+ON_TRUCK = 2        # "On truck N", where N is the status argument
+DELIVERED = 3       # "Delivered at T", where T (in seconds) is the status argument
+
+
+# Columnar storage for package data: one typed array per field, where a package is the same index in each. Times are
+# kept in seconds, and 0 stands for None in the time and truck columns (just as a timedelta of 0 or a None would be
+# falsy). Rarely used fields (special notes, clusters) are kept in dictionaries by index. Scans over a column run in C
+# through array.index, instead of visiting package objects one at a time
+class PackageStore:
+    def __init__(self):
+        self.ids = []
+        self.loc = array('l')           # -1 when the package has no valid address
+        self.deadline = array('q')
+        self.ready = array('q')
+        self.truck = array('h')
+        self.mass = array('d')
+        self.status = array('b')
+        self.status_arg = array('d')
+        self.notes = {}                 # index -> special note, for packages with a NOTED status
+        self.clusters = {}              # index -> list of package ids that must be delivered together
+        self.timeline = None            # A Timeline recording changes to the rows, while a day is being simulated
+
+    # Add a package's fields as a new row (times in seconds), returning its index; O(1)
+    def append(self, id, loc, deadline, ready, truck, mass, status):
+        index = len(self.ids)
+        self.ids.append(id)
+        self.loc.append(loc)
+        self.deadline.append(deadline or 0)
+        self.ready.append(ready or 0)
+        self.truck.append(truck or 0)
+        self.mass.append(mass if type(mass) in (int, float) else 0.0)
+        self.status.append(AT_HUB)
+        self.status_arg.append(0.0)
+        self.set_status(index, status)
+        return index
+
+    # Copy a row from another store, returning its index here; O(1)
+    def copy_row(self, other, i):
+        index = len(self.ids)
+        self.ids.append(other.ids[i])
+        self.loc.append(other.loc[i])
+        self.deadline.append(other.deadline[i])
+        self.ready.append(other.ready[i])
+        self.truck.append(other.truck[i])
+        self.mass.append(other.mass[i])
+        self.status.append(other.status[i])
+        self.status_arg.append(other.status_arg[i])
+        if i in other.notes:
+            self.notes[index] = other.notes[i]
+        if i in other.clusters:
+            self.clusters[index] = other.clusters[i]
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Set a status from its string form ("At Warehouse", or a special note); O(1)
+    def set_status(self, index, status):
+        self.notes.pop(index, None)
+        if status == "At Warehouse":
+            self.status[index] = AT_HUB
+        else:
+            self.status[index] = NOTED
+            self.notes[index] = status
+
+    # Build the string form of a status; O(1)
+    def status_string(self, index):
+        code = self.status[index]
+        if code == AT_HUB:
+            return "At Warehouse"
+        if code == ON_TRUCK:
+            return "On truck " + str(int(self.status_arg[index]))
+        if code == DELIVERED:
+            return "Delivered at " + str(timedelta(seconds=self.status_arg[index]))
+        return self.notes[index]
+
+    # The printed form of a package; O(1)
+    def row_string(self, index):
+        loc = self.loc[index]
+        string = "Package #" + str(self.ids[index]) + ": " + self.status_string(index) + " at location " + \
+                 str(None if loc == -1 else loc) + ". "
+        if self.deadline[index]:
+            string += "\tRequired delivery time at " + str(to_timedelta(self.deadline[index])) + "."
+        if self.clusters.get(index):
+            string += "\tClustered with packages " + str(self.clusters[index])
         return string
 
+    # Let the timeline (if one is recording) know that a row's location or status has changed; O(1)
+    def changed(self, index):
+        if self.timeline is not None:
+            self.timeline.record(index)
+
+    # Indexes of every package with a deadline; O(n)
+    def timely(self):
+        return list(compress(range(len(self.ids)), self.deadline))
+
+    # For each location, the earliest deadline (seconds, 0 if none) and required truck (0 if none) of the packages that
+    # still need to go there, found in one pass over the columns; O(n)
+    def loc_constraints(self, num_locs):
+        deadlines = array('q', bytes(8 * num_locs))
+        trucks = array('h', bytes(2 * num_locs))
+        for loc, deadline, truck, status in zip(self.loc, self.deadline, self.truck, self.status):
+            if loc == -1 or status == DELIVERED:
+                continue
+            if deadline and (not deadlines[loc] or deadline < deadlines[loc]):
+                deadlines[loc] = deadline
+            if truck and not trucks[loc]:
+                trucks[loc] = truck
+        return deadlines, trucks
+
+
+# A record of a simulated day, so the status of every package (and the miles of every truck) at any time can be looked
+# up instead of simulating the day again. It starts from a copy of the store's location and status columns when the
+# trucks leave, then each package keeps its own list of changes (loaded, on truck N, delivered at T, address change)
+# as (stamp, loc, status, status arg, note), in the order they happened. Truck miles are kept the same way, by
+# departure time. Changes are stamped with the time of the event that made them, doubled, plus the event's priority: a
+# system event (priority 0, an address change or packages getting ready) counts for a query of its own second, while a
+# truck's turn (priority 1) at that second only counts after it, like the simulation's own clock
+class Timeline:
+    # Ctor, takes the snapshot and starts recording the store's changes; O(n)
+    def __init__(self, store, trucks, clock=0):
+        self.store = store
+        self.clock = clock
+        self.stamp = 2 * clock
+        self.loc = array('l', store.loc)
+        self.status = array('b', store.status)
+        self.status_arg = array('d', store.status_arg)
+        self.notes = dict(store.notes)
+        self.times = [[] for i in range(len(store))]
+        self.changes = [[] for i in range(len(store))]
+        self.miles = {truck.id: truck.miles for truck in trucks}
+        self.mile_times = {truck.id: [] for truck in trucks}
+        self.mile_changes = {truck.id: [] for truck in trucks}
+        store.timeline = self
+
+    # Sets the time (and priority) of the event whose changes are recorded next; O(1)
+    def tick(self, clock, priority=0):
+        self.clock = clock
+        self.stamp = 2 * clock + priority
+
+    # Stop recording changes; O(1)
+    def close(self):
+        if self.store.timeline is self:
+            self.store.timeline = None
+
+    # Record a row's current location and status; O(1)
+    def record(self, index):
+        store = self.store
+        self.times[index].append(self.stamp)
+        self.changes[index].append((store.loc[index], store.status[index], store.status_arg[index],
+                                    store.notes.get(index)))
+
+    # Record a truck's miles, if it's driven since the last record; O(1)
+    def record_miles(self, truck):
+        changes = self.mile_changes[truck.id]
+        if truck.miles != (changes[-1] if changes else self.miles[truck.id]):
+            self.mile_times[truck.id].append(self.stamp)
+            changes.append(truck.miles)
+
+    # The miles a truck had driven (counting every drive it had set out on) by the given time; O(log k)
+    def miles_at(self, truck_id, seconds):
+        i = bisect_right(self.mile_times[truck_id], 2 * seconds) - 1
+        return self.mile_changes[truck_id][i] if i >= 0 else self.miles[truck_id]
+
+    # The store as it was at the given time, with each package's last change up to then (a system event at that very
+    # time counts, a truck's turn doesn't). Columns that don't change during the day are shared with the store rather than copied; O(n log k)
+    def snapshot(self, seconds):
+        store = self.store
+        at = PackageStore()
+        at.ids = store.ids
+        at.deadline = store.deadline
+        at.ready = store.ready
+        at.truck = store.truck
+        at.mass = store.mass
+        at.clusters = store.clusters
+        at.loc = array('l', self.loc)
+        at.status = array('b', self.status)
+        at.status_arg = array('d', self.status_arg)
+        at.notes = dict(self.notes)
+        for index, times in enumerate(self.times):
+            i = bisect_right(times, 2 * seconds) - 1
+            if i >= 0:
+                loc, status, status_arg, note = self.changes[index][i]
+                at.loc[index] = loc
+                at.status[index] = status
+                at.status_arg[index] = status_arg
+                at.notes.pop(index, None)
+                if note is not None:
+                    at.notes[index] = note
+        return at
+
+    # Walks every package's changes once, in time order, yielding (seconds, index, loc, status, status arg, note,
+    # truck) for each of the given times (sorted) and store indexes (all by default). The truck is the one holding or
+    # that delivered the package, 0 if none
+    # Big-O: O(p * (t + k)) for p packages, t times and k changes per package
+    def sweep(self, times, indexes=None):
+        times = sorted(times)
+        if indexes is None:
+            indexes = range(len(self.times))
+        states = []
+        for index in indexes:
+            note = self.notes.get(index)
+            truck = int(self.status_arg[index]) if self.status[index] == ON_TRUCK else 0
+            states.append([index, 0, self.loc[index], self.status[index], self.status_arg[index], note, truck])
+
+        for seconds in times:
+            stamp = 2 * seconds
+            for state in states:
+                index, i = state[0], state[1]
+                changes = self.times[index]
+                while i < len(changes) and changes[i] <= stamp:
+                    loc, status, status_arg, note = self.changes[index][i]
+                    state[2:6] = loc, status, status_arg, note
+                    if status == ON_TRUCK:
+                        state[6] = int(status_arg)
+                    elif status != DELIVERED:
+                        state[6] = 0
+                    i += 1
+                state[1] = i
+                yield (seconds, index) + tuple(state[2:])
+
+    # Every package's status at each of the given times, as a StatusTable. Rows can be limited to some store indexes,
+    # to packages going to a location, or to packages held or delivered by a truck
+    # Big-O: O(p * (t + k))
+    def statuses(self, times, indexes=None, loc=None, truck=None):
+        table = StatusTable()
+        for row in self.sweep(times, indexes):
+            if loc is not None and row[2] != loc or truck is not None and row[6] != truck:
+                continue
+            table.append(self.store.ids[row[1]], *row)
+        return table
+
+
+# Package statuses at many times, as columns: one row per package per time, ordered by time then package. Rows format
+# their status the way a PackageStore does, and can be written out as CSV or JSON lines
+class StatusTable:
+    columns = ("time", "id", "loc", "status", "truck")
+
+    def __init__(self):
+        self.time = array('d')
+        self.ids = []
+        self.loc = array('l')
+        self.status = array('b')
+        self.status_arg = array('d')
+        self.truck = array('h')
+        self.notes = {}                 # row -> special note, for rows with a NOTED status
+
+    # Add a row; O(1)
+    def append(self, id, seconds, index, loc, status, status_arg, note, truck):
+        if note is not None:
+            self.notes[len(self.ids)] = note
+        self.time.append(seconds)
+        self.ids.append(id)
+        self.loc.append(loc)
+        self.status.append(status)
+        self.status_arg.append(status_arg)
+        self.truck.append(truck)
+
+    def __len__(self):
+        return len(self.ids)
+
+    status_string = PackageStore.status_string
+
+    # Each row as a dictionary of its printable values; O(n)
+    def rows(self):
+        for row in range(len(self.ids)):
+            loc = self.loc[row]
+            yield {"time": str(timedelta(seconds=self.time[row])), "id": self.ids[row],
+                   "loc": None if loc == -1 else loc, "status": self.status_string(row),
+                   "truck": self.truck[row] or None}
+
+    # Write the rows to a CSV file (a path, or an open file such as sys.stdout), with a header; O(n)
+    def to_csv(self, path):
+        if hasattr(path, "write"):
+            writer = csv.DictWriter(path, self.columns)
+            writer.writeheader()
+            writer.writerows(self.rows())
+            return
+        with open(path, "w", newline="") as file:
+            self.to_csv(file)
+
+    # Write the rows to a file (a path, or an open file), one JSON object per line; O(n)
+    def to_jsonl(self, path):
+        if hasattr(path, "write"):
+            for row in self.rows():
+                path.write(json.dumps(row) + "\n")
+            return
+        with open(path, "w") as file:
+            self.to_jsonl(file)
+
+
+# Convert a timedelta (or None) to whole seconds, with None as 0. Seconds are passed through; O(1)
+def to_seconds(time):
+    if time is None:
+        return 0
+    if isinstance(time, timedelta):
+        return int(time.total_seconds())
+    return int(time)
+
+
+# Convert seconds back to a timedelta, with 0 as None. Timedeltas are immutable, so the same object is handed out for
+# the same time; O(1)
+@lru_cache(maxsize=4096)
+def to_timedelta(seconds):
+    if not seconds:
+        return None
+    return timedelta(seconds=seconds)
+
 
 # Given a string time, return a timedelta. Returns None if string was not valid; O(1)
 def get_time(str_time):
-    if type(str_time) == set:
+    if type(str_time) != str:
         return None
+    return to_timedelta(time_seconds(str_time))
+
+
+# Given a string time like "10:30 am", return the seconds since midnight. Returns None if string was not valid.
+# Manifests repeat the same few dozen times, so results are memoized; O(1)
+@lru_cache(maxsize=4096)
+def time_seconds(str_time):
     str_arr = str_time.split(":")
     if len(str_arr) == 1:
         return None
     hour = int(str_arr[0])
     temp = str_arr[1].split()
     minute = int(temp[0])
-    meridiem = temp[1]
-    if meridiem == "pm" and hour >= 1:
+    meridiem = temp[1].lower() if len(temp) > 1 else ""
+    if meridiem == "pm" and hour < 12:
         hour += 12
-    return timedelta(hours=hour, minutes=minute)
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return hour * 3600 + minute * 60
 
 
-# A package-specific node class to be used by the hash_table class, as a node that points to other nodes.
-class PkgNode:
-    def __init__(self, pkg):
-        self.pkg = pkg
-        self.next = None
-
-
-# A hash table with a given array size. Also keeps a dictionary of location->pkgs
+# A hash table of packages that uses open addressing. Packages are kept in compact parallel lists in the order they
+# were inserted (key, hash, package), and a separate slot array maps each hash slot to a position in those lists. The
+# slot array doubles when it gets too full, so lookups stay O(1) amortized at any volume. Any hashable key (int id or
+# tracking number string) can be used. Also keeps a dictionary of location->pkgs
 class PkgHashTable:
-    def __init__(self, arr_size):
-        self.arr_size = arr_size
-        self.arr = [PkgNode(Package(-1, "", "", "", "", "", ""))]  # -1 is the sign of an empty bucket)
-        for i in range(arr_size - 1):
-            self.arr.append(PkgNode(Package(-1, "", "", "", "", "", "")))
+    max_load = 2 / 3    # Grow once more than this fraction of the slots are in use
+
+    def __init__(self, arr_size=8):
+        self.arr_size = 8
+        while self.arr_size * self.max_load < arr_size:     # Start with room for the given amount of packages
+            self.arr_size *= 2
+        self.slots = array('q', [-1]) * self.arr_size  # -1 is the sign of an empty slot
+        self.store = PackageStore()         # Columns of package data, one row per entry
+        self.ids = self.store.ids           # Parallel lists, one entry per package in insertion order
+        self.hashes = []
+        self.pkgs = []
         self.len = 0
         self.loc_dictionary = {}            # A dictionary that maps a location to packages with that location
         for i in range(len(Map.locations)):
             self.loc_dictionary[i] = []
-        self.timelies = []                  # A list for packages with a time constraint
         self.groups = {}                    # A dictionary for packages that need to be grouped (id : {pkg_ids})
 
-    # Insert a new node onto the hash table
+    # Insert a new package into the hash table
     def insert(self, id, address, city, zip, deadline, mass, status="At Warehouse"):
-        # if type(status) == set:
-        #     self.groups[id] = status
-        #     status = "At Warehouse"
-        pkg = Package(id, address, city, zip, deadline, mass, status)
-        pkg_hash = pkg.id % self.arr_size
-        node = self.arr[pkg_hash]  # a node that will help us traverse the hash table
-        if node.pkg.id == -1:
-            node.pkg = pkg
-        else:
-            while node.next:
-                node = node.next
-            node.next = PkgNode(pkg)
-        self.len += 1
+        if id in self:
+            raise Exception("Package", id, "is already in the table!")
+        pkg = Package(id, address, city, zip, deadline, mass, status, self.store)
+        self.add(pkg)
         self.loc_dictionary[pkg.loc].append(pkg.id)
-        if deadline.__contains__(":"):
-            self.timelies.append(id)
+
+    # Insert a batch of new packages given as columns, one sequence per insert argument (such as a chunk of a manifest).
+    # The table is grown once up front, and each id is probed once for both the duplicate check and its slot. Returns
+    # how many were inserted; O(n) amortized
+    def insert_columns(self, ids, addresses, cities, zips, deadlines, masses, statuses):
+        self.reserve(self.len + len(ids))
+        store = self.store
+        for id, address, city, zip_code, deadline, mass, status in zip(ids, addresses, cities, zips, deadlines, masses,
+                                                                        statuses):
+            key_hash = hash(id)
+            slot = self.probe(id, key_hash)
+            if self.slots[slot] != -1:
+                raise Exception("Package", id, "is already in the table!")
+            pkg = Package(id, address, city, zip_code, deadline, mass, status, store)
+            self.slots[slot] = self.len
+            self.hashes.append(key_hash)
+            self.pkgs.append(pkg)
+            self.len += 1
+            self.loc_dictionary[pkg.loc].append(id)
+        return len(ids)
+
+    # Store a package under its id, growing the table first if it would pass max_load. A package made outside of this
+    # table has its row copied into the table's store; O(1) amortized
+    def add(self, pkg):
+        if (self.len + 1) > self.arr_size * self.max_load:
+            self.resize(self.arr_size * 2)
+        key_hash = hash(pkg.id)
+        slot = self.probe(pkg.id, key_hash)
+        if self.slots[slot] != -1:
+            raise Exception("Package", pkg.id, "is already in the table!")
+        if pkg.store is not self.store or pkg.index != self.len:
+            pkg.index = self.store.copy_row(pkg.store, pkg.index)
+            pkg.store = self.store
+        self.slots[slot] = self.len
+        self.hashes.append(key_hash)
+        self.pkgs.append(pkg)
+        self.len += 1
+
+    # Find the slot for a key: either the slot holding it, or the empty slot where it would go. Uses the same
+    # perturbed probe sequence as Python's dict, so clustered keys (like sequential ids) don't form long runs; O(1) avg
+    def probe(self, key, key_hash):
+        mask = self.arr_size - 1
+        perturb = key_hash & 0xFFFFFFFFFFFFFFFF
+        slot = perturb & mask
+        while True:
+            entry = self.slots[slot]
+            if entry == -1 or (self.hashes[entry] == key_hash and self.ids[entry] == key):
+                return slot
+            perturb >>= 5
+            slot = (slot * 5 + perturb + 1) & mask
+
+    # Grow the table once so that a known amount of packages can be added without resizing along the way; O(n)
+    def reserve(self, count):
+        arr_size = self.arr_size
+        while arr_size * self.max_load < count:
+            arr_size *= 2
+        if arr_size != self.arr_size:
+            self.resize(arr_size)
+
+    # Rebuild the slot array at a new size from the stored hashes (keys are not rehashed); O(n)
+    def resize(self, arr_size):
+        self.arr_size = arr_size
+        self.slots = array('q', [-1]) * arr_size
+        mask = arr_size - 1
+        for entry in range(self.len):
+            perturb = self.hashes[entry] & 0xFFFFFFFFFFFFFFFF
+            slot = perturb & mask
+            while self.slots[slot] != -1:
+                perturb >>= 5
+                slot = (slot * 5 + perturb + 1) & mask
+            self.slots[slot] = entry
 
     # A lookup function that takes a pkg id and returns the Package object with the id; or None if none is found.
     def lookup(self, id):
-        pkg_hash = id % self.arr_size
-        node = self.arr[pkg_hash]  # a node that will help us traverse the hash table
-        if node.pkg.id == -1:  # if it's an empty bucket
+        entry = self.slots[self.probe(id, hash(id))]
+        if entry == -1:  # if it's an empty slot
             return None
-        while node is not None:  # Traverse the linked list until a match is found
-            if node.pkg.id == id:
-                return node.pkg
-            node = node.next
-        return None
+        return self.pkgs[entry]
+
+    # The ids of all packages with a time constraint, found by a scan of the deadline column; O(n)
+    @property
+    def timelies(self):
+        return [self.ids[i] for i in self.store.timely()]
+
+    # Allows "id in pkgs"
+    def __contains__(self, id):
+        return self.slots[self.probe(id, hash(id))] != -1
 
-    # Make class iterable
+    def __len__(self):
+        return self.len
+
+    # Make class iterable. Walks the stored packages directly in insertion order, with no per-item lookups; O(n)
     def __iter__(self):
-        return PkgIterator(self)
+        return iter(self.pkgs)
+
+    # Views over the table that don't copy anything. If ordered is False, they walk the slot array instead of the
+    # insertion order (hash order)
+    def keys(self, ordered=True):
+        return PkgView(self, PkgView.IDS, ordered)
+
+    def values(self, ordered=True):
+        return PkgView(self, PkgView.PKGS, ordered)
+
+    def items(self, ordered=True):
+        return PkgView(self, PkgView.ITEMS, ordered)
+
+    # A generator of entry positions, in insertion order or in slot order; O(n)
+    def entries(self, ordered=True):
+        if ordered:
+            yield from range(self.len)
+        else:
+            for entry in self.slots:
+                if entry != -1:
+                    yield entry
 
     # Defining the string function (for easier debugging)
     def __str__(self):
         s = ""
         for i in range(self.arr_size):
             s += str(i) + ":\t\t"
-            node = self.arr[i]
-            while node is not None:
-                s += str(node.pkg.id) + "\t"
-                node = node.next
+            if self.slots[i] != -1:
+                s += str(self.ids[self.slots[i]])
             s += "\n"
         return s
 
 
-# An iterator class for the hash table
-class PkgIterator:
-    def __init__(self, pkgs):
-        self.pkgs = pkgs
-        self.index = 0
+# A live view of the ids, packages or (id, package) pairs in a PkgHashTable. Iterating it reads the table's storage
+# directly, so sparse or non-contiguous ids are all returned, and nothing is copied
+class PkgView:
+    IDS = 0
+    PKGS = 1
+    ITEMS = 2
 
-    # Figure out which package to return next
-    def __next__(self):
-        self.index += 1
-        if self.index > self.pkgs.len:
-            self.index = 0
-            raise StopIteration
-        return self.pkgs.lookup(self.index)
+    def __init__(self, table, kind, ordered=True):
+        self.table = table
+        self.kind = kind
+        self.ordered = ordered
+
+    def __len__(self):
+        return self.table.len
+
+    def __iter__(self):
+        table = self.table
+        if self.ordered:
+            if self.kind == PkgView.IDS:
+                return iter(table.ids)
+            if self.kind == PkgView.PKGS:
+                return iter(table.pkgs)
+            return zip(table.ids, table.pkgs)
+        return self.walk_slots()
+
+    # A generator over the table in slot order
+    def walk_slots(self):
+        table = self.table
+        for entry in table.entries(False):
+            if self.kind == PkgView.IDS:
+                yield table.ids[entry]
+            elif self.kind == PkgView.PKGS:
+                yield table.pkgs[entry]
+            else:
+                yield table.ids[entry], table.pkgs[entry]
 
 
 # A method that inserts package data into our hash table.
@@ -244,6 +806,11 @@ def load_pkgs(pkgs):
     pkgs.insert(40, "380 W 2880 S", "Salt Lake City", "84115", "10:30 AM", 45)                              # Loc 18
 
 
+# The mid-day updates that go with the packages above: package 9 is listed at the wrong address until it's corrected at
+# 10:20 (the same update is in "WGUPS Updates.csv", for the WGUPS Package File)
+slc_updates = [(time_seconds("10:20 am"), "address", 9, "410 S State St", "84111")]
+
+
 # A class that represents a location to deliver a package to
 class Location:
     def __init__(self, id, name, address, zip):
@@ -251,22 +818,49 @@ class Location:
         self.name = name
         self.address = address
         self.zip = zip
-        self.deltime = None
+        self.deadline = 0       # Earliest deadline of the location's packages, in seconds (0 if none)
         self.truck = None
         self.all_pkgs_available = True  # Assume all pkgs are available
-        self.ready_at = None
+        self.ready = 0          # When the location's last delayed package gets to the hub, in seconds (0 if none)
         self.routed = False     # Location been added to a route
         self.clustered = False
 
+    # Clear what a previous day's routing left on the location; O(1)
+    def reset(self):
+        self.deadline = 0
+        self.truck = None
+        self.all_pkgs_available = True
+        self.ready = 0
+        self.routed = False
+        self.clustered = False
+
     def to_string(self):
         return self.id + "\t" + self.name + "\t" + self.address
 
+    # The deadline and ready time as timedeltas, for display and older callers
+    @property
+    def deltime(self):
+        return to_timedelta(self.deadline)
+
+    @deltime.setter
+    def deltime(self, deltime):
+        self.deadline = to_seconds(deltime)
+
+    @property
+    def ready_at(self):
+        return to_timedelta(self.ready)
+
+    @ready_at.setter
+    def ready_at(self, ready_at):
+        self.ready = to_seconds(ready_at)
+
+    # Keep the earliest deadline (in seconds) of the location's packages; O(1)
+    def add_deadline(self, deadline):
+        if deadline and (not self.deadline or deadline < self.deadline):
+            self.deadline = deadline
+
     def add_deltime(self, deltime):
-        if self.deltime:
-            if deltime and deltime < self.deltime:
-                self.deltime = deltime
-        else:
-            self.deltime = deltime
+        self.add_deadline(to_seconds(deltime))
 
 
 # A location group class, which will help us keep track of the order in which location groups are visited.
@@ -279,26 +873,27 @@ class LocGroup:
         self.pkg_size = 0           # How many packages are represented by this group
         self.part_of_group = None
         self.center = None
+        self.sums = {}              # Each loc in the group -> the sum of its distances to the other locs in the group
         self.deltime = None         # earliest delivery time
         self.mileage_cost = None    # How many miles are spent in the group
         self.dividable = True
         self.truck = None
 
-    # Add a location or group of locations to the group; O(n^2)
+    # Add a location or group of locations to the group. The sum of distances from each member to the rest of the group
+    # is kept up to date as members are added, so the center never needs an all-pairs rebuild; O(|new| * |existing|)
     def add(self, loc, pkgs_added=0, truck_requirement=None, deltime=None):
         self.pair.append(loc)
         self.truck = truck_requirement
 
-        # Update size, pkg_size & locs
+        # Update size, pkg_size, locs & sums
         if type(loc) == LocGroup:
             self.size += loc.size
             self.pkg_size += loc.pkg_size
-            for l in loc:
-                self.locs.append(l)
+            self.add_sums(list(loc), loc.sums)
         else:
             self.size += 1
             self.pkg_size += pkgs_added
-            self.locs.append(loc)
+            self.add_sums([loc])
 
         if type(loc) == LocGroup:
             if self.deltime is None or loc.deltime and loc.deltime < self.deltime:
@@ -316,27 +911,29 @@ class LocGroup:
 
         # If this is the second loc/group, define a new center
         else:
-            # Redefine the center vertex (the one with the lowest sum of edges going to other vertexes in the group)
-            verts = {}  # Dictionary (loc index -> sum of edges)
-            for i in self.locs:
-                for j in self.locs:
-                    if i in verts.keys():
-                        verts[i] += Map.distances[i][j]  # Sum the edges
-                    else:
-                        verts[i] = Map.distances[i][j]
-
-            # Get the key holding the minimal value
-            keys = list(verts.keys())
-            values = list(verts.values())
-            min = sorted(values)[0]     # O(n log n)
-            self.center = keys[values.index(min)]   # Get index of minimum value, then use it to look up the key
+            # The center vertex is the one with the lowest sum of edges going to other vertexes in the group (the first
+            # one in locs, if there's a tie)
+            self.center = min(self.sums, key=self.sums.__getitem__)   # O(n)
+
+    # Add new members to locs and sums. Existing members get the distances to the new ones added on, and new members
+    # start from their sums within their old group (if any) plus the distances to the existing ones
+    # Big-O: O(|new| * |existing|)
+    def add_sums(self, added, added_sums=None):
+        rows = Map.distances
+        for l in self.locs:
+            self.sums[l] += sum(map(rows[l].__getitem__, added))
+        existing = self.locs
+        for l in added:
+            own = added_sums[l] if added_sums else 0.0
+            self.sums[l] = own + sum(map(rows[l].__getitem__, existing))
+        self.locs.extend(added)
 
     # Once vertices are finalized for the group, call this method to make the path within this group. Updates locs.
     # O(n log n)
     def make_path(self, from_vertex, map):
         # There is a small chance that this group only has one location, check for this occurrence
         if len(self.pair) == 1 and type(self.pair[0]) == int:
-            return
+            return self.locs
 
         # For each member of the pair, get the integer id of the location, or the center if it's a group, and deltimes
         first = self.pair[0]
@@ -362,8 +959,8 @@ class LocGroup:
         # Check if we need to swap the order of the pair, for timeliness or closeness. The pair is treated like [a, b]
         # Compare the distance from the given vertex to each member of the pair, set a_closer = (a is closer than b?)
         swapped = False
-        distances = map.min_dist(from_vertex, [first, second])  # O(n log n)
-        if distances[0][0] == second:
+        closest = map.nearest(from_vertex, 1, [first, second])
+        if closest[0][0] == second:
             a_closer = False
         else:
             a_closer = True
@@ -516,6 +1113,72 @@ class LocIter:
         return all_locs
 
 
+# A disjoint-set forest over group ids, tracking which top group every group (and so every location) is now part of.
+# Uses union by size and path compression, so finding a top group is nearly O(1) no matter how deep the LocGroup pair
+# tree gets. The pair tree itself is left alone for make_path and overview
+class GroupSets:
+    def __init__(self):
+        self.parent = array('l')    # group id -> parent id in the forest (itself for a root)
+        self.size = array('l')      # root id -> how many groups are in its set
+        self.top = {}               # root id -> the top LocGroup of its set
+
+    # Add a new group as a set of its own. Group ids are handed out in order, so the id is also its index; O(1)
+    def add(self, group):
+        while len(self.parent) <= group.id:
+            self.parent.append(len(self.parent))
+            self.size.append(1)
+        self.top[group.id] = group
+
+    # Find the root of a group id's set, pointing everything on the way straight at the root; O(α(n))
+    def find(self, id):
+        root = id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[id] != root:
+            self.parent[id], id = root, self.parent[id]
+        return root
+
+    # Merge sub_group's set into group's set, with group as the top of the merged set; O(α(n))
+    def union(self, group, sub_group):
+        a = self.find(group.id)
+        b = self.find(sub_group.id)
+        if a != b:
+            if self.size[a] < self.size[b]:
+                a, b = b, a
+            self.parent[b] = a
+            self.size[a] += self.size[b]
+            del self.top[b]
+        self.top[a] = group
+
+    # Return the top group that a group is part of; O(α(n))
+    def top_group(self, group):
+        return self.top[self.find(group.id)]
+
+
+# The groups that aren't contained by another group, kept in the order they became top groups. Works like the list it
+# replaces (append, remove, in, iteration), but every operation is O(1)
+class TopGroups:
+    def __init__(self):
+        self.groups = {}    # group id -> group
+
+    def append(self, group):
+        self.groups[group.id] = group
+
+    def remove(self, group):
+        if self.groups.get(group.id) is not group:
+            raise ValueError("Group " + str(group.id) + " is not a top group")
+        del self.groups[group.id]
+
+    def __contains__(self, group):
+        return self.groups.get(group.id) is group
+
+    def __iter__(self):
+        return iter(self.groups.values())
+
+    def __len__(self):
+        return len(self.groups)
+
+
 # A class containing a hash table of all locations, as well as an adjacency matrix
 class Map:
     locations = [
@@ -583,41 +1246,201 @@ class Map:
          13.1, 4.1, 4.7, 3.1, 7.8, 1.3, 8.3, 0]
     ]
 
-    # Fill out the adjacency matrix for easier use later, also get the avg length and create groups for shortest lengths
-    # for every vertex; O(n^2)
+    builtin_locations = locations   # The Salt Lake City map, kept so it can be put back after another map is used
+    builtin_table = distances
+    builtin_matrix = None           # The Salt Lake City (matrix, avg_len), once it's been built
+
+    matrix = None   # The full distance table as one contiguous, row-major float64 array (rows are viewed by distances)
+    size = 0        # How many locations (rows/columns) are in the matrix
+    addresses = None    # A dictionary of normalized (address, zip) -> location id, built by index_addresses
+    orders = []     # A cached list of neighbors sorted by distance for each location (None until first needed)
+    travel = {}     # speed -> rows of driving times in seconds, built by travel_times
+    version = 0     # Counts the distance tables used, so caches kept outside the map can tell when it's changed
+    avg_len = 0.0
+
+    # Build the dense matrix the first time a Map is made; O(n^2)
     def __init__(self):
-        self.avg_len = 0.0
-        size = len(self.distances)
+        if Map.matrix is None:
+            Map.use_builtin()
+
+    # Use the built-in Salt Lake City map, putting it back if a loaded or generated one replaced it. Nothing changes
+    # (and cached routes stay valid) if it's already in use; O(n^2) the first time, O(n) after
+    @staticmethod
+    def use_builtin():
+        if Map.builtin_matrix is None:
+            Map.set_distances(Map.builtin_table)
+            Map.builtin_matrix = Map.matrix, Map.avg_len
+        elif Map.matrix is not Map.builtin_matrix[0]:
+            Map.set_matrix(Map.builtin_matrix[0], len(Map.builtin_locations), Map.builtin_matrix[1])
+        if Map.locations is not Map.builtin_locations:
+            Map.set_locations(Map.builtin_locations)
+
+    # Expand a lower-triangle (or square) distance table into a contiguous row-major matrix, then use it as the map's
+    # distances. Also gets the avg edge length; O(n^2)
+    @staticmethod
+    def set_distances(table):
+        size = len(table)
+        matrix = array('d', bytes(8 * size * size))
+        total = 0.0
         for i in range(size):
-            for j in range(size):
-                try:
-                    self.avg_len += self.distances[i][j]
-                except:
-                    self.distances[i].append(self.distances[j][i])
-        total_edges = size * (size - 1) / 2
-        self.avg_len /= total_edges
+            row = table[i]
+            for j in range(min(len(row), i + 1)):
+                matrix[i * size + j] = row[j]
+                matrix[j * size + i] = row[j]
+                total += row[j]
+        avg_len = total / (size * (size - 1) / 2) if size > 1 else 0.0
+        Map.set_matrix(matrix, size, avg_len)
+
+    # The map in use (its matrix, size, average edge and locations), so it can be put back with restore; O(1)
+    @staticmethod
+    def save():
+        if Map.matrix is None:
+            Map.use_builtin()
+        return Map.matrix, Map.size, Map.avg_len, Map.locations
+
+    # Puts back a map returned by save; O(n)
+    @staticmethod
+    def restore(state):
+        matrix, size, avg_len, locations = state
+        Map.set_matrix(matrix, size, avg_len)
+        Map.set_locations(locations)
+
+    # Use a full row-major float64 matrix (an array, or any buffer such as a memory-mapped file) as the map's distances,
+    # pointing distances at its rows so that distances[i][j] keeps working everywhere. Nothing is copied; O(n)
+    @staticmethod
+    def set_matrix(matrix, size, avg_len=0.0):
+        view = memoryview(matrix).cast('B').cast('d')
+        if len(view) != size * size:
+            raise Exception("Distance matrix has", len(view), "entries, expected", size * size)
+        Map.matrix = matrix
+        Map.size = size
+        Map.avg_len = avg_len
+        Map.distances = [view[i * size:(i + 1) * size] for i in range(size)]
+        Map.orders = [None] * size
+        Map.travel = {}
+        Map.version += 1
+
+    # The driving time, in whole seconds, between every pair of locations at a speed (mph), as rows like distances.
+    # Built once per speed from the distance matrix and cached until the map changes; O(n^2) the first time, O(1) after
+    @staticmethod
+    def travel_times(speed):
+        rows = Map.travel.get(speed)
+        if rows is None:
+            if Map.matrix is None:
+                Map.use_builtin()
+            size = Map.size
+            scale = 3600 / speed
+            times = array('q', [round(dist * scale) for dist in memoryview(Map.matrix).cast('B').cast('d')])
+            view = memoryview(times)
+            rows = [view[i * size:(i + 1) * size] for i in range(size)]
+            Map.travel[speed] = rows
+        return rows
+
+    # Replace the map's locations (for a different city), so the address index is rebuilt on the next lookup; O(1)
+    @staticmethod
+    def set_locations(locations):
+        Map.locations = locations
+        Map.addresses = None
+
+    # Clear the per-day state of every location, so another scenario can be run on the same map; O(n)
+    @staticmethod
+    def reset_locations():
+        for loc in Map.locations:
+            loc.reset()
+
+    # Return a location's neighbors (not itself) sorted by distance, ties by index. Built lazily and cached, since the
+    # distance table never changes during a day; O(n log n) the first time, O(1) after
+    def neighbors(self, x):
+        order = Map.orders[x]
+        if order is None:
+            row = self.distances[x]
+            order = sorted(range(self.size), key=row.__getitem__)
+            order.remove(x)
+            Map.orders[x] = order
+        return order
+
+    # Return a list of the k nearest (index, dist) tuples to the given location, closest first (all of them if k is
+    # None). Option to give a list of indexes for desired adjacent locations. Ignores distance to self. Ties keep the
+    # order of adj_list, the same as a stable sort would
+    # Big-O: O(k) for the whole map, about O(n) at worst for a candidate list
+    def nearest(self, x, k=None, adj_list=None):
+        row = self.distances[x]
+        order = self.neighbors(x)
+        if not adj_list:
+            if k is not None:
+                order = order[:k]
+            return [(i, row[i]) for i in order]
+
+        # Remember where each candidate was given, so ties can be put back in that order
+        position = {}
+        for i in adj_list:
+            if i != x and i not in position:
+                position[i] = len(position)
+        if k is None or k > len(position):
+            k = len(position)
+        tie_order = lambda i: (row[i], position[i])
+
+        # A short candidate list is cheaper to sort than to find by walking the neighbor order
+        if len(position) * len(position).bit_length() < self.size:
+            found = sorted(position, key=tie_order)[:k]
+            return [(i, row[i]) for i in found]
+
+        # Walk the neighbor order, stopping at the k-th match (plus anything tied with it)
+        found = []
+        for i in order:
+            if i in position:
+                if len(found) >= k and row[i] != row[found[-1]]:
+                    break
+                found.append(i)
+        found.sort(key=tie_order)
+        return [(i, row[i]) for i in found[:k]]
 
     # Return a list of tuples (index, dist) for indexes adjacent to the given location.
     # Option to give a list of indexes for desired adjacent locations. Ignores distance to self
-    # Big-O: O(n log n)
+    # Big-O: O(n)
     def min_dist(self, x, adj_list=[]):
-        adj_dict = {}
-        # If a list was provided
-        if len(adj_list) > 0:
-            for i in adj_list:
-                if i != x:
-                    adj_dict[i] = self.distances[x][i]
-        # Return all adjacencies
-        else:
-            for i in range(len(self.distances)):
-                if i != x:
-                    adj_dict[i] = self.distances[x][i]
-        return sorted(adj_dict.items(), key=lambda x: x[1])     # O(n log n)
+        return self.nearest(x, None, adj_list)
 
-    # Looks up address and zip for a match, then returns a location id if a match is found
+    # Looks up address and zip for a match, then returns a location id if a match is found. Uses a dictionary keyed on
+    # the normalized (address, zip), which is built the first time it's needed; O(1)
     @staticmethod
     def lookup(address, zip):
+        if Map.addresses is None:
+            Map.index_addresses()
+        return Map.addresses.get((normalize_address(address), normalize_zip(zip)), -1)
+
+    # Build the (address, zip) -> location id dictionary used by lookup; O(n)
+    @staticmethod
+    def index_addresses():
+        Map.addresses = {}
         for l in Map.locations:
-            if l.zip == zip and l.address == address:
-                return l.id
-        return -1
\ No newline at end of file
+            Map.addresses.setdefault((normalize_address(l.address), normalize_zip(l.zip)), l.id)
+
+
+# Words that are spelled out or abbreviated interchangeably in addresses, mapped to one form
+address_words = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "avenue": "ave", "boulevard": "blvd", "street": "st", "road": "rd", "drive": "dr", "lane": "ln", "court": "ct",
+    "parkway": "pkwy", "place": "pl", "circle": "cir", "highway": "hwy",
+}
+unit_words = {"#", "apt", "unit", "suite", "ste", "bldg", "fl", "floor", "rm", "room"}
+
+
+# Reduce an address to a form that ignores case, spacing, punctuation, spelled out directions/street types, and unit
+# suffixes like "#104", so that different spellings of the same place match. Memoized, since manifests repeat a few
+# thousand addresses many times over; O(1) after the first call for an address
+@lru_cache(maxsize=None)
+def normalize_address(address):
+    words = str(address).lower().replace("#", " # ").replace(".", " ").replace(",", " ").split()
+    normal = []
+    for word in words:
+        if word in unit_words or word.startswith("#"):
+            break   # Everything from the unit on is dropped
+        normal.append(address_words.get(word, word))
+    return " ".join(normal)
+
+
+# Reduce a zip code to its 5 digits (drops ZIP+4 and handles zips read in as numbers); O(1)
+@lru_cache(maxsize=None)
+def normalize_zip(zip):
+    return str(zip).strip().split("-")[0][:5]
@@ -0,0 +1,203 @@
+# Author:           Wesley Lancaster
+# StudentID:        #001356953
+# Date:             September 2020
+# WGUPS_Routing.py: Route improvement, used to shorten the paths that LocGroup.make_path builds
+
+import time
+from WGUPS_Objects import Map
+
+
+# * * * * *   Local Search   * * * * * #
+# Improves a path (a list of location ids, driven from start and then back to end) with 2-opt and Or-opt moves until
+# no move helps or the time budget (in seconds) runs out. Each move's change in miles is found in O(1) from the
+# distance matrix, and a shorter path is only kept if it's no later than the current one at the locations' deltimes.
+# Times are in seconds since midnight, and speed is in miles per hour. Returns a new list
+# Big-O: O(n^2) per pass, O(n) more for each improving move
+def improve_path(path, start, speed, start_time, budget=0.05, end=0):
+    if len(path) < 3:
+        return list(path)
+    stop_at = time.perf_counter() + budget
+    seq = [start] + list(path) + [end]
+    lateness = path_lateness(seq, speed, start_time)
+    improved = True
+    while improved and time.perf_counter() < stop_at:
+        improved = False
+        for move in (two_opt, or_opt):
+            candidate = move(seq, speed, start_time, lateness, stop_at)
+            if candidate:
+                seq, lateness = candidate
+                improved = True
+    return seq[1:-1]
+
+
+# Finds the first 2-opt move (reversing seq[i..j]) that shortens the path without making it later, and returns the new
+# (seq, lateness), or None if there isn't one. The ends of seq stay put
+# Big-O: O(n^2)
+def two_opt(seq, speed, start_time, lateness, stop_at):
+    dist = Map.distances
+    n = len(seq) - 1
+    for i in range(1, n - 1):
+        a = seq[i - 1]
+        b = seq[i]
+        row_a = dist[a]
+        row_b = dist[b]
+        for j in range(i + 1, n):
+            c = seq[j]
+            e = seq[j + 1]
+            delta = row_a[c] + row_b[e] - row_a[b] - dist[c][e]
+            if delta < -1e-9:
+                candidate = seq[:i] + seq[i:j + 1][::-1] + seq[j + 1:]
+                candidate_lateness = path_lateness(candidate, speed, start_time)
+                if candidate_lateness <= lateness:
+                    return candidate, candidate_lateness
+        if time.perf_counter() > stop_at:
+            return None
+    return None
+
+
+# Finds the first Or-opt move (moving a run of 1 to 3 stops elsewhere, either way around) that shortens the path
+# without making it later, and returns the new (seq, lateness), or None if there isn't one
+# Big-O: O(n^2)
+def or_opt(seq, speed, start_time, lateness, stop_at):
+    dist = Map.distances
+    n = len(seq) - 1
+    for length in (1, 2, 3):
+        for i in range(1, n - length + 1):
+            j = i + length - 1      # The run is seq[i..j]
+            prev = seq[i - 1]
+            first = seq[i]
+            last = seq[j]
+            after = seq[j + 1]
+            removed = dist[prev][first] + dist[last][after] - dist[prev][after]
+            for k in range(0, n):
+                if i - 1 <= k <= j:
+                    continue    # Inserting between seq[k] and seq[k + 1] has to be outside of the run
+                u = seq[k]
+                v = seq[k + 1]
+                forward = dist[u][first] + dist[last][v] - dist[u][v]
+                backward = dist[u][last] + dist[first][v] - dist[u][v]
+                if min(forward, backward) - removed < -1e-9:
+                    run = seq[i:j + 1] if forward <= backward else seq[i:j + 1][::-1]
+                    rest = seq[:i] + seq[j + 1:]
+                    at = k + 1 if k < i else k + 1 - length
+                    candidate = rest[:at] + run + rest[at:]
+                    candidate_lateness = path_lateness(candidate, speed, start_time)
+                    if candidate_lateness <= lateness:
+                        return candidate, candidate_lateness
+            if time.perf_counter() > stop_at:
+                return None
+    return None
+
+
+# Returns the total seconds that a path arrives past the deltimes of its stops (0 if every deadline is met). The first
+# entry of seq is where the truck starts. Each leg takes the whole seconds a Truck's drive takes
+# Big-O: O(n)
+def path_lateness(seq, speed, start_time):
+    travel = Map.travel_times(speed)
+    locations = Map.locations
+    clock = start_time
+    late = 0
+    for k in range(1, len(seq)):
+        clock += travel[seq[k - 1]][seq[k]]
+        deadline = locations[seq[k]].deadline
+        if deadline and clock > deadline:
+            late += clock - deadline
+    return late
+
+
+# Returns the miles driven along a path, from its first entry to its last
+# Big-O: O(n)
+def path_miles(seq):
+    dist = Map.distances
+    return sum(dist[seq[k - 1]][seq[k]] for k in range(1, len(seq)))
+
+
+# * * * * *   Exact Solver   * * * * * #
+# Held-Karp over subsets of stops, in flat arrays that are kept between calls (grown as needed) so a solve doesn't
+# allocate its table. Solved routes are memoized by everything that affects the answer, including the map's version
+dp_cost = []        # dp_cost[mask * n + i]: fewest miles from start through the stops in mask, ending at stop i
+dp_parent = []      # The stop visited before i on that best path (-1 for the first stop)
+solved = {}         # (map version, start, end, stops, deadlines, speed, start_time) -> best path (a tuple), or None if late
+max_solved = 10000  # Forget the memo once it holds this many routes
+
+
+# Returns the path (a list of location ids, from start and back to end) with the fewest miles that gets to every stop
+# by its deltime, or None if there isn't one. States that arrive late are cut while the table is built. Since there's
+# no waiting, fewer miles to a state always means an earlier arrival, so cutting late states keeps the answer exact
+# Big-O: O(2^n * n^2), only meant for small n
+def solve_exact(path, start, speed, start_time, end=0):
+    stops = list(dict.fromkeys(path))
+    n = len(stops)
+    if n < 2:
+        return stops
+    deadlines = tuple(Map.locations[s].deadline for s in stops)
+    key = (Map.version, start, end, tuple(stops), deadlines, speed, start_time)
+    if key in solved:
+        path = solved[key]
+        return list(path) if path is not None else None     # A copy, so the caller can't change the memo
+
+    # Reuse the tables if they're big enough
+    size = (1 << n) * n
+    if len(dp_cost) < size:
+        dp_cost.extend([0.0] * (size - len(dp_cost)))
+        dp_parent.extend([0] * (size - len(dp_parent)))
+    inf = float("inf")
+    for k in range(size):
+        dp_cost[k] = inf
+
+    dist = Map.distances
+    between = [[dist[a][b] for b in stops] for a in stops]
+    per_mile = 3600 / speed
+    limits = [(d - start_time) / per_mile if d else inf for d in deadlines]  # Latest mileage to still be on time
+
+    # First stops
+    for i in range(n):
+        miles = dist[start][stops[i]]
+        if miles <= limits[i]:
+            dp_cost[(1 << i) * n + i] = miles
+            dp_parent[(1 << i) * n + i] = -1
+
+    # Extend every on-time state by one more stop
+    for mask in range(1, 1 << n):
+        base = mask * n
+        for i in range(n):
+            miles = dp_cost[base + i]
+            if miles == inf:
+                continue
+            row = between[i]
+            for j in range(n):
+                if mask & (1 << j):
+                    continue
+                total = miles + row[j]
+                if total > limits[j]:
+                    continue
+                k = (mask | (1 << j)) * n + j
+                if total < dp_cost[k]:
+                    dp_cost[k] = total
+                    dp_parent[k] = i
+
+    # Close the path at the end location, then walk back through the parents
+    full = (1 << n) - 1
+    best = None
+    best_miles = inf
+    for i in range(n):
+        total = dp_cost[full * n + i] + dist[stops[i]][end]
+        if total < best_miles:
+            best = i
+            best_miles = total
+    result = None
+    if best is not None:
+        result = []
+        mask = full
+        i = best
+        while i != -1:
+            result.append(stops[i])
+            parent = dp_parent[mask * n + i]
+            mask &= ~(1 << i)
+            i = parent
+        result.reverse()
+
+    if len(solved) >= max_solved:
+        solved.clear()
+    solved[key] = tuple(result) if result is not None else None
+    return result
@@ -0,0 +1,1062 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# WGUPS_Scenario.py:    Holds the state of one WGUPS workday (its trucks, packages and location groups), and the
+#                       algorithm that routes and simulates it
+
+from WGUPS_Objects import Truck, Map, PkgHashTable, load_pkgs, LocGroup, Location, GroupSets, TopGroups, to_seconds, \
+    DELIVERED, ON_TRUCK, Timeline, DeliveryLog, print_delivery
+from WGUPS_Loader import load_pkg_file, load_distance_file
+from WGUPS_Routing import improve_path, solve_exact
+from collections import deque
+from datetime import timedelta
+from time import perf_counter
+import heapq
+
+# Simulation event types. System events (package updates, then packages ready) go before truck events at the same time
+ADDRESS = 0     # A package's address has been corrected
+DELAY = 1       # A package won't reach the hub until later than planned
+CANCEL = 2      # A package has been cancelled, and won't be delivered
+READY = 3       # Delayed packages have reached the hub (the checkup time)
+ARRIVE = 4      # A truck has arrived at a stop, and delivers its packages there
+RETURN = 5      # A truck has arrived at (or is waiting at) the hub
+
+# The event type for each kind of package update in a Scenario's updates
+update_types = {"address": ADDRESS, "delay": DELAY, "cancel": CANCEL}
+
+NEVER = 99 * 24 * 3600  # A time (in seconds) after any day is over, for trucks that are done and checkups not needed
+
+# A single run of the WGUPS workday. Each scenario has its own fleet, packages and groups, so several can be run one
+# after another in the same process (the map's per-day location state is reset by setup)
+class Scenario:
+    # Ctor, takes the fleet and routing settings. Times are seconds after midnight (or timedeltas); O(1)
+    def __init__(self, num_trucks=2, truck_speed=18.0, max_packages=16, start_time=8 * 3600, pkg_file=None,
+                 distance_file=None, improve_routes=False, improve_budget=0.05, exact_routes=False, exact_max_stops=12,
+                 hash_tbl_size=16, strict=True, verbose=True, manifest=None, updates=None, city=None):
+        self.num_trucks = num_trucks
+        self.truck_speed = truck_speed
+        self.max_packages = max_packages    # per truck
+        self.start_time = to_seconds(start_time)
+        self.pkg_file = pkg_file            # A package manifest (XLSX, CSV or JSONL) to load, or None for the built-in
+        self.distance_file = distance_file  # A distance table (XLSX or CSV) to load, or None for the built-in map
+        self.city = city                    # A generated City to run on when there's no distance_file
+        self.improve_routes = improve_routes    # Shorten each route with 2-opt/Or-opt moves after make_path
+        self.improve_budget = improve_budget    # Seconds of local search allowed per route
+        self.exact_routes = exact_routes        # Solve routes with few enough stops exactly (Held-Karp)
+        self.exact_max_stops = exact_max_stops  # The most stops a route can have to be solved exactly
+        self.hash_tbl_size = hash_tbl_size  # Starting capacity of the package hash table (it grows as needed)
+        self.strict = strict                # Raise on a late delivery or a stale update, otherwise record it
+        self.verbose = verbose              # Print each delivery and planning step as the day goes
+        self.manifest = manifest            # Rows of PkgHashTable.insert arguments to load instead of a pkg_file
+        # Package updates that come in during the day, as (time, kind, pkg id, ...): (time, "address", id, address,
+        # zip) corrects an address, (time, "delay", id, ready time) holds a package back until it reaches the hub, and
+        # (time, "cancel", id) cancels it. The built-in packages' updates are slc_updates
+        self.updates = updates
+        self.feed = []                      # The updates for the day being run
+        self.wrong_addresses = set()        # Ids of packages whose address is known to be wrong until corrected
+        self.cancelled = set()              # Ids of packages that have been cancelled
+        self.stale_updates = []             # Updates that came too late to apply, as (time, kind, pkg id, reason)
+
+        self.status_time = None
+        self.group_num = -1
+        self.map = Map()
+        self.pkgs = PkgHashTable(1)
+        self.groups = []                # A list of all groups
+        self.group_sets = GroupSets()   # Which top group each group is part of
+        self.top_groups = TopGroups()   # Only groups that aren't contained by another group
+        self.trucks = []
+        self.available_locs = []        # A list of locations that have only available packages
+        self.unavailable_locs = []      # A list of locations that have an unavailable package
+        self.checkup_time = NEVER       # A time to check on our unavailable packages
+        self.full_cluster = []
+        self.events = []                # The simulation's event heap of (time, priority, truck id, type, data)
+        self.checkup_event = None       # The checkup time that's queued on the heap
+        self.deliveries = DeliveryLog()  # Every delivery made, as (truck, pkg, loc, time, miles)
+        self.timeline = None            # Every package change the simulation made, for looking up past statuses
+        self.timings = {}               # Wall-clock seconds spent in each phase of setup (load, cluster, ...)
+
+    # * * * * *   Simulate Function   * * * * * #
+    # Simulates the WGUPS workday up to status_time (in seconds, or "End of Day"). This function is the "clock" of
+    # the simulation, its only logic is to make sure the timeline is correct. Other functions are used for the actual
+    # algorithm
+    # Big-O: O(n^3)
+    def setup(self, status_time):
+        # Instantiate all variables
+        if status_time == "End of Day":
+            status_time = NEVER
+        status_time = to_seconds(status_time)
+        self.status_time = status_time
+        self.timings = {}
+        started = perf_counter()
+        self.available_locs = []
+        self.unavailable_locs = []
+        self.trucks = []
+        self.checkup_time = NEVER
+        self.full_cluster = []
+        if self.distance_file:
+            load_distance_file(self.distance_file, report=self.verbose)
+        elif self.city is not None:
+            self.city.use()
+        else:
+            Map.use_builtin()     # An earlier day may have loaded or generated another map
+        self.map.reset_locations()
+        self.pkgs = PkgHashTable(self.hash_tbl_size)
+        if self.pkg_file:
+            load_pkg_file(self.pkgs, self.pkg_file, report=self.verbose)
+        elif self.manifest is not None:
+            self.pkgs.reserve(len(self.manifest))
+            for row in self.manifest:
+                self.pkgs.insert(*row)
+        else:
+            load_pkgs(self.pkgs)
+        # A location's packages all go out on one truck, so a truck has to be able to carry each location's load
+        for loc_id, pkg_ids in self.pkgs.loc_dictionary.items():
+            if len(pkg_ids) > self.max_packages:
+                raise Exception("Location", loc_id, "has", len(pkg_ids), "packages, more than a truck can carry (" +
+                                str(self.max_packages) + ")")
+        self.feed = list(self.updates or [])
+        for update in self.feed:
+            if update[1] not in update_types:
+                raise Exception("Unknown package update", update[1], "for package", update[2])
+        self.wrong_addresses = {update[2] for update in self.feed if update[1] == "address"}
+        self.cancelled = set()
+        self.stale_updates = []
+        self.deliveries = DeliveryLog(len(self.pkgs), print_delivery if self.verbose else None)
+        for i in range(self.num_trucks):
+            self.trucks.append(Truck(i+1, self.truck_speed, self.max_packages, self.start_time, self.strict,
+                                     self.deliveries))
+        started = self.lap("load", started)
+
+        # Get all of the cluster to hold the same data O(n)
+        cluster = None
+        for pkg in self.pkgs:
+            if self.manage_clusters(pkg):
+                cluster = self.manage_clusters(pkg)  # We do it twice so the entire cluster has the same data
+        if cluster:
+            for pkg in cluster:
+                pkg = self.pkgs.lookup(pkg)
+                pkg.cluster = cluster
+                self.map.locations[pkg.loc].clustered = True
+            self.full_cluster = cluster
+        started = self.lap("cluster", started)
+
+        # 1- Group locations and load trucks with their packages
+        self.group_locs(self.start_time, first=True)
+        started = self.lap("group", started)
+        for truck in self.trucks:
+            self.create_route(truck)  # O(n^3)
+        started = self.lap("route", started)
+
+        # 2- Initiate simulation, keeping track of the time
+        self.simulate(status_time)
+        self.lap("simulate", started)
+        return self
+
+    # Records the time spent in a phase since started, and returns the time now for the next phase; O(1)
+    def lap(self, phase, started):
+        now = perf_counter()
+        self.timings[phase] = now - started
+        return now
+
+    # Prints the status of every package and the miles each truck has driven, either where the simulation stopped or
+    # at an earlier status_time, which is looked up in the timeline instead of simulating the day again; O(n log k)
+    def report(self, status_time=None):
+        store = self.pkgs.store
+        miles = {truck.id: truck.miles for truck in self.trucks}
+        if status_time is None:
+            status_time = self.status_time
+        else:
+            status_time = to_seconds(status_time)
+            store = self.timeline.snapshot(status_time)
+            miles = {truck_id: self.timeline.miles_at(truck_id, status_time) for truck_id in miles}
+
+        print("\n\n\nStatuses at ", timedelta(seconds=status_time))
+        for pkg in self.pkgs:
+            print(store.row_string(pkg.index))
+        total_miles = 0
+        for truck_id in miles:
+            total_miles += miles[truck_id]
+            print("Truck", truck_id, "has driven", round(miles[truck_id], 1), "miles")
+        print("Total miles:", round(total_miles, 2))
+
+    # The status of packages at each of the given times (in seconds), from one sweep over the day's timeline. Can be
+    # limited to some package ids, a location, or a truck; returns a StatusTable with to_csv and to_jsonl
+    # Big-O: O(p * (t + k)) for p packages, t times and k changes per package
+    def statuses(self, times, pkg_ids=None, loc=None, truck=None):
+        indexes = None
+        if pkg_ids is not None:
+            indexes = []
+            for pkg_id in pkg_ids:
+                pkg = self.pkgs.lookup(pkg_id)
+                if pkg is None:
+                    raise Exception("Package #", pkg_id, "not found")
+                indexes.append(pkg.index)
+        seconds = [to_seconds(time) for time in times]
+        return self.timeline.statuses(seconds, indexes, loc, truck)
+
+    # The totals a fleet plan is judged by: miles driven, how late packages were, and when the last truck finished.
+    # Meant for a full day (status_time of "End of Day"); O(n)
+    def results(self):
+        late = [entry for truck in self.trucks for entry in truck.late]
+        finished = [truck.done_at for truck in self.trucks if truck.done_at is not None]
+        undelivered = len(self.pkgs) - self.pkgs.store.status.count(DELIVERED) - len(self.cancelled)
+        return {
+            "total_miles": round(sum(truck.miles for truck in self.trucks), 2),
+            "late_packages": len(late),
+            "lateness_minutes": round(sum(seconds for pkg_id, seconds in late) / 60, 2),
+            "max_lateness_minutes": round(max((seconds for pkg_id, seconds in late), default=0) / 60, 2),
+            "undelivered": undelivered,
+            "cancelled": len(self.cancelled),
+            "makespan_hours": round((max(finished) - self.start_time) / 3600, 3) if finished else None,
+        }
+
+    # A recursive algorithm that manages package clusters
+    # Big-O: O(n)
+    def manage_clusters(self, given, cluster=None, visited=None):
+        # If this package's cluster is None
+        if not given.cluster:
+            # If this package's cluster is empty, set it to the given cluster with its ID
+            if not cluster:
+                return
+            elif not cluster.__contains__(given.id):
+                cluster.append(given.id)
+                given.cluster = cluster
+                return cluster
+
+        if not visited:
+            visited = []
+            cluster = []
+        visited.append(given.id)
+
+        if not cluster.__contains__(given.id):
+            cluster.append(given.id)
+
+        # Recursively visit all in the cluster
+        for pkg in given.cluster:
+            if not visited.__contains__(pkg):
+                pkg = self.pkgs.lookup(pkg)
+                new_cluster = self.manage_clusters(pkg, cluster, visited)
+                for p in new_cluster:
+                    if not cluster.__contains__(p):
+                        cluster.append(p)
+        given.cluster = cluster
+        return cluster
+
+    # The algorithm that assigns packages based on location. first is only for the day's first grouping, which sorts
+    # every location into available and unavailable; any later call (even at the start time) only regroups
+    # Big-O: O(n^2 log n)
+    def group_locs(self, time, locs=None, first=False):
+        # Create variables needed for this method
+        group_lookup = {}  # A dictionary of all group objects, with all ids pointing to their group
+        if locs:
+            ungrouped = locs  # A list of Location ids that haven't been grouped yet
+        else:
+            self.check_pkg_availability(time, first)
+            ungrouped = self.available_locs.copy()  # A list of Location ids that haven't been grouped yet
+
+        # Check if only one location is available
+        if len(ungrouped) == 1:
+            self.create_single_group(ungrouped[0], ungrouped, group_lookup)
+            return
+
+        # Make the cluster into a special group
+        if self.full_cluster:
+            cluster_locs = []
+            # There can't be a package that is both unavailable and clustered, so group immediately
+            # are delivered to it
+            for pkg in self.full_cluster:
+                pkg = self.pkgs.lookup(pkg)
+                # Get all the locations for the pkgs in the cluster, except any that's already gone out on a truck
+                if pkg.loc is None or self.map.locations[pkg.loc].routed:
+                    continue
+                if not cluster_locs.__contains__(pkg.loc):
+                    cluster_locs.append(pkg.loc)
+                # Remove this loc from ungrouped for this frame (it'll be grouped in its own frame)
+                if ungrouped.__contains__(pkg.loc):
+                    ungrouped.remove(pkg.loc)
+            self.full_cluster = None
+            if cluster_locs:
+                self.group_locs(time, cluster_locs)  # Group only the cluster locs
+
+        # Make sure all locations are in a group, starting with shortest edges
+        self.group_shortest_edges(ungrouped, False, group_lookup)    # O(n^2 log n)
+
+        # Combine groups when able, closest centers first. Every pair of groups that could be combined (pkg_size limit
+        # and truck requirements) waits on a heap by center-to-center distance. Once a group has been combined it's
+        # dropped from small_groups, so any pair still on the heap that uses it is stale, and is skipped when it's
+        # popped. Each merge only adds the pairs for the new group; O(n^2 log n)
+        small_groups = {}   # group id -> group, for groups that haven't been combined yet
+        order = {}          # group id -> the order it joined small_groups (ties go to the earliest pair)
+        pairs = []          # (distance between centers, order of first, order of second, first, second)
+        for group in self.top_groups:
+            self.add_candidate(group, small_groups, order, pairs)
+        heapq.heapify(pairs)
+
+        while pairs:
+            distance, order_a, order_b, a, b = heapq.heappop(pairs)
+            if a.id not in small_groups or b.id not in small_groups:
+                continue    # Stale, one of them has already been combined
+            del small_groups[a.id]
+            del small_groups[b.id]
+            group = self.combine_groups(a, b)    # O(n)
+            self.add_candidate(group, small_groups, order, pairs, True)
+            # print("Combined groups", a.id, ",", b.id, "at distance of", distance)  # Debug print
+        return
+
+    # Adds a group to small_groups for group_locs, along with a pair for every group it could be combined with (pkg_size
+    # limit and truck requirements). If push, pairs are pushed onto the heap, otherwise they're just added to the list
+    # Big-O: O(n log n)
+    def add_candidate(self, group, small_groups, order, pairs, push=False):
+        row = self.map.distances[group.center]
+        order[group.id] = len(order)
+        for other in small_groups.values():
+            if group.pkg_size + other.pkg_size <= self.max_packages and group.truck == other.truck:
+                pair = (row[other.center], order[other.id], order[group.id], other, group)
+                if push:
+                    heapq.heappush(pairs, pair)
+                else:
+                    pairs.append(pair)
+        small_groups[group.id] = group
+
+    # Takes a list of locations and groups by shortest edges, Kruskal style: edges go on a heap, the shortest is popped
+    # until every location is grouped (or, if fully_group, until they're all in one group), so the long edges are never
+    # sorted. Ungrouped locations are kept in a set for O(1) checks
+    # Big-O: O(n^2 log n) at worst, O(n^2) to build the heap
+    def group_shortest_edges(self, ungrouped, fully_group, group_lookup=None):
+        if self.verbose:
+            print("\n\nCalled group_shortest_edges\n\n")
+        if group_lookup is None:
+            group_lookup = {}
+        these_groups = []
+        locs = list(dict.fromkeys(ungrouped))     # Each location once, in the order given
+        ungrouped = set(locs)
+        components = len(ungrouped)     # How many separate groups/locations are left to join
+
+        # Every edge (v1, v2) with v2 before v1 in the list, as (length, order, v1, v2). The order keeps equal lengths
+        # in the order they were listed. A location is never joined to itself; O(n^2)
+        edges = []
+        for i in range(len(locs)):
+            v1 = locs[i]
+            row = self.map.distances[v1]
+            for j in range(i):
+                v2 = locs[j]
+                if v2 == v1:
+                    continue
+                edges.append((row[v2], len(edges), v1, v2))
+        heapq.heapify(edges)    # O(n^2)
+
+        # Group shortest edges; O(n^2 log n) at worst, but we stop as soon as we're done
+        while edges and components > 1:
+            length, order, v1, v2 = heapq.heappop(edges)
+
+            if fully_group:
+                # Add vertices to a group if one is still ungrouped
+                if v1 in ungrouped or v2 in ungrouped:
+                    these_groups = self.create_group(v1, v2, ungrouped, group_lookup)
+                    components -= 1
+                # Combine groups if no location is ungrouped
+                if not ungrouped:
+                    g1 = self.get_top_group(group_lookup[v1])
+                    g2 = self.get_top_group(group_lookup[v2])
+                    if g1 is not g2:
+                        these_groups = self.combine_groups(g1, g2)  # If fully_group, we only need the top group
+                        components -= 1
+            else:
+                # Add vertices to a group if one is still ungrouped, and a truck could still carry the group
+                if (v1 in ungrouped or v2 in ungrouped) and self.can_group(v1, v2, ungrouped, group_lookup):
+                    group = self.create_group(v1, v2, ungrouped, group_lookup)
+                    these_groups.append(group)
+
+                # Added. Now check if we need to stop
+                if not ungrouped:
+                    break
+
+        # Any location that couldn't join a group (every nearby group was full) gets a group of its own; O(n)
+        if not fully_group:
+            for loc in locs:
+                if loc in ungrouped:
+                    these_groups.append(self.create_single_group(loc, ungrouped, group_lookup))
+
+        return these_groups
+
+    # Whether the locations or groups at l1 and l2 can be grouped: a truck has to be able to carry all their packages,
+    # and they can't require different trucks
+    # Big-O: O(α(n))
+    def can_group(self, l1, l2, ungrouped, group_lookup):
+        size = 0
+        trucks = set()
+        for loc in (l1, l2):
+            if loc in ungrouped:
+                item = self.map.locations[loc]
+                size += len(self.pkgs.loc_dictionary[loc])
+            else:
+                item = self.get_top_group(group_lookup[loc])
+                size += item.pkg_size
+            if item.truck:
+                trucks.add(item.truck)
+        return size <= self.max_packages and len(trucks) <= 1
+
+    # Puts a single location in a group of its own
+    # Big-O: O(1)
+    def create_single_group(self, loc_id, ungrouped, group_lookup):
+        group = LocGroup(self.get_group_num())
+        loc = self.map.locations[loc_id]
+        group.add(loc.id, len(self.pkgs.loc_dictionary[loc.id]), loc.truck, loc.deltime)
+        group_lookup[loc.id] = group
+        ungrouped.remove(loc.id)
+        self.add_group(group)
+        self.top_groups.append(group)
+        return group
+
+    # A method that adds two locations to a single group, or groups one vertex with another group. l1 and l2 must be
+    # location IDs. Combines groups, do not use on a loop!
+    # Big-O: O(n^2)
+    def create_group(self, l1, l2, ungrouped=[], group_lookup=None):
+
+        # Add the two objects in one group
+        if ungrouped.__contains__(l1):
+
+            # Group v1 and v2 in new group
+            if ungrouped.__contains__(l2):
+                group = LocGroup(self.get_group_num())
+                loc1 = self.map.locations[l1]
+                loc2 = self.map.locations[l2]
+                truck = self.get_truck_req(loc1, loc2)
+                group.add(l1, len(self.pkgs.loc_dictionary[l1]), truck, loc1.deltime)
+                group.add(l2, len(self.pkgs.loc_dictionary[l2]), truck, loc2.deltime)
+                group_lookup[l1] = group
+                group_lookup[l2] = group
+                ungrouped.remove(l1)
+                ungrouped.remove(l2)
+                self.add_group(group)
+                self.top_groups.append(group)
+                return group
+
+            # Create new group for v1 containing v2's group
+            else:
+                v2_group = group_lookup[l2]
+                v2_group = self.get_top_group(v2_group)  # Only deal with top groups
+                group = LocGroup(self.get_group_num())
+                loc1 = self.map.locations[l1]
+                truck = self.get_truck_req(loc1, v2_group)
+                group.add(l1, len(self.pkgs.loc_dictionary[l1]), truck, loc1.deltime)
+                group.add(v2_group, v2_group.pkg_size, truck, v2_group.deltime)
+                group_lookup[l1] = group
+                ungrouped.remove(l1)
+                self.add_group(group)
+                self.join_group(group, v2_group)
+                self.top_groups.remove(v2_group)
+                self.top_groups.append(group)
+                return group
+
+        # Create new group for v1 containing v2's group
+        elif ungrouped.__contains__(l2):
+            v1_group = group_lookup[l1]
+            v1_group = self.get_top_group(v1_group)  # Only deal with top groups
+            group = LocGroup(self.get_group_num())
+            loc2 = self.map.locations[l2]
+            truck = self.get_truck_req(v1_group, loc2)
+            group.add(l2, len(self.pkgs.loc_dictionary[l2]), truck, loc2.deltime)
+            group.add(v1_group, v1_group.pkg_size, truck, v1_group.deltime)
+            group_lookup[l2] = group
+            ungrouped.remove(l2)
+            self.add_group(group)
+            self.join_group(group, v1_group)
+            self.top_groups.remove(v1_group)
+            self.top_groups.append(group)
+            return group
+
+        else:
+            # Combine the group for v1 and v2
+            v1_group = group_lookup[l1]
+            v1_group = self.get_top_group(v1_group)  # Only deal with top groups
+            v2_group = group_lookup[l2]
+            v2_group = self.get_top_group(v2_group)  # Only deal with top groups
+            return self.combine_groups(v1_group, v2_group)
+
+    # A method that combines two different groups into a single group. Differs from create_group because it requires
+    # groups
+    # Big-O: O(n^2)
+    def combine_groups(self, g1, g2):
+        if g1 == g2:
+            return g1
+        g1 = self.get_top_group(g1)
+        g2 = self.get_top_group(g2)
+        truck = self.get_truck_req(g1, g2)
+        group = LocGroup(self.get_group_num())
+        group.add(g1)
+        group.add(g2)
+        group.truck = truck
+        self.add_group(group)
+        self.join_group(group, g1)
+        self.join_group(group, g2)
+        if self.top_groups.__contains__(g1):
+            self.top_groups.remove(g1)
+        if self.top_groups.__contains__(g2):
+            self.top_groups.remove(g2)
+        self.top_groups.append(group)
+        return group
+
+    # Helper method for adding vertexes to groups
+    # Big-O: O(α(n))
+    def get_top_group(self, group):
+        return self.group_sets.top_group(group)
+
+    # Records a newly made group in the list of groups and the disjoint sets
+    # Big-O: O(1)
+    def add_group(self, group):
+        self.groups.append(group)
+        self.group_sets.add(group)
+
+    # Makes sub_group part of group, in both the pair tree and the disjoint sets
+    # Big-O: O(α(n))
+    def join_group(self, group, sub_group):
+        sub_group.part_of_group = group.id
+        self.group_sets.union(group, sub_group)
+
+    # A simple method to increment and return the group_num
+    # Big-O: O(1)
+    def get_group_num(self):
+        self.group_num += 1
+        return self.group_num
+
+    # A method to get the truck requirements from 2 items. Args may be a Location or a LocGroup
+    # Big-O: O(1)
+    def get_truck_req(self, arg_1, arg_2):
+        truck_1 = arg_1.truck
+        truck_2 = arg_2.truck
+        if truck_1 or truck_2:
+            if truck_1:
+                if truck_2:
+                    if truck_1 != truck_2:
+                        raise Exception("Cannot combine groups with different trucks:", truck_1, "and", truck_2)
+                    else:
+                        return truck_1
+                else:
+                    return truck_1
+            else:
+                return truck_2
+        return None
+
+    # Checks and updates packages based on their ready times, and updates available/unavailable locations. Only the
+    # first checkup of the day (first) sorts every location; later ones move the unavailable locations that are now
+    # ready, each once, and skip any that's already been routed
+    # Big-O: O(n)
+    def check_pkg_availability(self, time, first=False):
+        # Instantiate all variables
+        self.top_groups = TopGroups()
+        self.groups = []
+        self.group_sets = GroupSets()
+        self.group_num = -1
+
+        # If this is the first checkup
+        if first:
+            for loc in self.map.locations:
+                # Skip the hub, and any location with nothing to deliver
+                if loc.id == 0 or not self.pkgs.loc_dictionary[loc.id]:
+                    continue
+                # If the location has package that isn't ready, or if it doesn't have a deltime
+                if loc.ready and loc.ready > time or not loc.deadline:
+                    if self.checkup_time and loc.ready:
+                        self.checkup_time = loc.ready
+                    elif loc.ready:
+                        self.checkup_time = min(self.checkup_time, loc.ready)
+                    self.unavailable_locs.append(loc.id)
+
+                # If the location is ready to go
+                else:
+                    self.available_locs.append(loc.id)
+
+        # If this is a midday checkup
+        else:
+            # Update checkup_time
+            if self.checkup_time <= time:
+                self.checkup_time = NEVER
+                for loc in self.unavailable_locs:
+                    loc = self.map.locations[loc]
+                    if loc.ready and loc.ready > time:
+                        self.checkup_time = min(self.checkup_time, loc.ready)
+
+            # Update locations, using the earliest deadline and truck requirement left at each one
+            deadlines, trucks_required = self.pkgs.store.loc_constraints(len(self.map.locations))
+            for loc in self.map.locations:
+                # For unavailable locations
+                if self.unavailable_locs.__contains__(loc.id):
+                    # If it's now ready, move to available locations
+                    if loc.ready and loc.ready <= time or self.checkup_time == NEVER:
+                        self.unavailable_locs.remove(loc.id)
+                        if not loc.routed and not self.available_locs.__contains__(loc.id):
+                            self.available_locs.append(loc.id)
+
+                # For available locations, remove fully delivered locs and update others
+                elif loc.routed and self.available_locs.__contains__(loc.id):
+                    self.available_locs.remove(loc.id)
+                else:
+                    loc.deadline = deadlines[loc.id]
+                    loc.truck = trucks_required[loc.id] or None
+
+        return
+
+    # Creates a route from top_groups for a truck with a given id
+    # Big-O: O(n^3)
+    def create_route(self, truck):
+        route_groups = []
+        num_pkgs = 0
+
+        # Debug print
+        # print("\nTruck", truck.id, "arrived at hub. Available groups:")
+        # for group in top_groups:
+        #     print(group.overview())
+
+        # Add package groups with correct truck requirements
+        for group in self.top_groups:
+            if not group.truck or group.truck == truck.id:
+                route_groups.append(group)
+                num_pkgs += group.pkg_size
+
+        # If we have multiple groups, find the best group to keep (the soonest delivery time that has a truck req)
+        route = None
+        if len(route_groups) > 1:
+            if num_pkgs > self.max_packages:
+                g2_time = timedelta(days=99)
+                best = None
+
+                # Find soonest delivery time; O(n^2), but probably a fraction of O(n) in practice
+                for g1 in route_groups:
+                    # Set g1_time. Since groups can have a None deltime, use an artificial "long" deltime
+                    g1_time = g1.deltime or timedelta(days=99)
+
+                    # Compare deltimes between each group (only compare the same groups once)
+                    for g2 in route_groups:
+                        if g1 == g2:
+                            break
+                        # Set g2_time
+                        if g2.deltime:
+                            g2_time = g2.deltime
+                        else:
+                            continue
+                        # Have best set to the group with the smallest time
+                        if g1_time < g2_time:
+                            if not best or not best.deltime or g1.deltime < best.deltime:
+                                best = g1
+                        elif g1_time > g2_time:
+                            if not best or not best.deltime or g2.deltime < best.deltime:
+                                best = g2
+
+                    # Always give truck requirements priority
+                    if g1.truck:
+                        if not best or not best.truck:
+                            best = g1
+
+                # Create the route
+                if best:
+                    route = best
+                else:
+                    route = route_groups[0]     # No timelies/truck reqs, so just assign it the first group
+
+            # If the truck can fit all packages
+            else:
+                locs = []
+                for group in route_groups:
+                    self.top_groups.remove(group)   # Replaced by the route's group, so they can't be routed again
+                    for loc in group.locs:
+                        locs.append(loc)
+                route = self.group_shortest_edges(locs, True)    # O(n^3)
+
+        # If only one route was selected in route_groups
+        elif route_groups:
+            route = route_groups[0]
+        else:
+            # print("\nCould not find a suitable group for Truck", truck.id, "\n")
+            return
+
+        # Make a good path to traverse the route
+        self.plan_path(route, truck, 0)
+
+        # Add all packages from all locations in the route; O(n)
+        for loc in route.locs:
+            # If it's clustered, don't add unavailable packages, and keep the loc available if there are any
+            if self.map.locations[loc].clustered:
+                all_pkgs_loaded = True
+                for pkg in self.pkgs.loc_dictionary[loc]:
+                    pkg = self.pkgs.lookup(pkg)
+                    # Load all available packages (that an earlier route didn't already take), flag if there's one
+                    # that's unavailable
+                    if self.carrier(pkg):
+                        continue
+                    if not pkg.ready or pkg.ready <= truck.time:
+                        truck.load(pkg)
+                    else:
+                        all_pkgs_loaded = False
+                if all_pkgs_loaded:
+                    self.map.locations[loc].routed = True
+                    if self.available_locs.__contains__(loc):
+                        self.available_locs.remove(loc)
+                    elif self.unavailable_locs.__contains__(loc):
+                        self.unavailable_locs.remove(loc)    # Remove clustered pkg w/ no deltime, marked as unavailable
+
+            # If it's not clustered, add all undelivered packages (but not one that's on its way there on another truck,
+            # after an address change) and make location unavailable
+            else:
+                for pkg in self.pkgs.loc_dictionary[loc]:
+                    pkg = self.pkgs.lookup(pkg)
+                    if self.carrier(pkg):
+                        continue
+                    if pkg.ready and pkg.ready > truck.time:
+                        raise Exception("Loaded package that was unavailable!")
+                    # Check status and update if needed
+                    if pkg.status != "At Warehouse":
+                        stat = pkg.status
+                        if type(stat) == str:
+                            if stat.__contains__("Truck") or stat.__contains__(":"):
+                                truck.load(pkg)
+                            else:
+                                raise Exception("Package #", pkg.id, "has a bad status: ", pkg.status)
+                        elif type(stat) == list:
+                            truck.load(pkg)
+                        else:
+                            raise Exception("Package #", pkg.id, "has a bad status: ", pkg.status)
+                    else:
+                        truck.load(pkg)
+                self.map.locations[loc].routed = True
+                self.available_locs.remove(loc)
+
+        # print("Loaded truck", truck.id, "with", route.overview(), "\n")
+        self.top_groups.remove(route)
+        return route
+
+    # Launches the trucks on their route, then runs the day as a heap of events keyed by (time, priority, truck id), so
+    # system events (packages ready, address changes) happen before any truck acts at the same time. Each truck keeps
+    # exactly one event queued, its next arrival, so the clock never rescans the fleet
+    # Big-O: O(n^3), O(log T) per event for T trucks
+    def simulate(self, status_time):
+        self.events = []
+        self.checkup_event = None
+        for update in self.feed:
+            heapq.heappush(self.events, (to_seconds(update[0]), 0, 0, update_types[update[1]], update[2:]))
+
+        # Have all trucks drive to their first stop
+        for truck in self.trucks:
+            if truck.packages:
+                truck.drive(truck.packages[0].loc)
+            self.schedule_truck(truck)
+        self.schedule_checkup()
+        self.timeline = Timeline(self.pkgs.store, self.trucks, self.start_time)
+
+        # Handle the earliest event, until the status time is reached or there's nothing left to do. System events at the
+        # status time still happen (an address change at 10:20 shows at 10:20), trucks' turns then don't; O(n^3)
+        while self.events and (self.events[0][0] < status_time or self.events[0][:2] == (status_time, 0)):
+            clock, priority, truck_id, kind, data = heapq.heappop(self.events)
+            self.timeline.tick(clock, priority)
+            if kind == ADDRESS:
+                self.change_address(clock, *data)
+            elif kind == DELAY:
+                self.delay_pkg(clock, *data)
+            elif kind == CANCEL:
+                self.cancel_pkg(clock, *data)
+            elif kind == READY:
+                # Skip a checkup that's been moved since it was queued
+                if clock != self.checkup_time:
+                    continue
+                self.checkup_event = None
+                self.group_locs(clock)
+            else:
+                truck = self.trucks[truck_id - 1]
+                self.move_truck(truck, clock)
+                self.timeline.record_miles(truck)
+                self.schedule_truck(truck)
+            self.schedule_checkup()
+        self.timeline.close()
+        return
+
+    # Queues a truck's next event, unless it's done for the day; O(log T)
+    def schedule_truck(self, truck):
+        if truck.time < NEVER:
+            kind = RETURN if truck.loc == 0 else ARRIVE
+            heapq.heappush(self.events, (truck.time, 1, truck.id, kind, None))
+
+    # Queues the checkup for unavailable packages, if it's changed since it was last queued; O(log T)
+    def schedule_checkup(self):
+        if self.checkup_time != self.checkup_event and self.checkup_time < NEVER:
+            self.checkup_event = self.checkup_time
+            heapq.heappush(self.events, (self.checkup_time, 0, 0, READY, None))
+
+    # A truck's turn at the given time: deliver what's due at its stop, then head to the next stop, back to the hub, or
+    # (at the hub) load a new route or wait for packages
+    # Big-O: O(n^3)
+    def move_truck(self, truck, clock):
+        # Deliver all packages in our truck's location
+        pkg = None
+        if truck.packages:
+            pkg = truck.packages[0]
+        # Unload each package on the truck; O(n)
+        while truck.packages and truck.loc == pkg.loc:
+            # Hold back a package whose address is wrong, until its correction comes in
+            if pkg.id in self.wrong_addresses:
+                pkg = truck.packages.popleft()
+                self.move_pkg(pkg, None)    # Ensures that pkg will not be delivered until address is updated
+                pkg.ready = NEVER
+                truck.load(pkg)  # Put package at end of list, truck will drop it off at hub
+            else:
+                truck.unload()
+                self.pkgs.loc_dictionary[pkg.loc].remove(pkg.id)
+            if truck.packages:
+                pkg = truck.packages[0]
+
+        # If truck is empty, or if it needs to return a package
+        if len(truck.packages) == 0 or truck.packages[0].loc is None:
+
+            # Go back to warehouse
+            if truck.loc != 0:
+                truck.drive(0)
+
+            # If at the warehouse
+            else:
+                # See if the truck has brought a package back (a bad address, or a cancellation); O(n)
+                if truck.packages:
+                    for pkg in truck.packages:
+                        # print("\nDropped off Package #", pkg.id, "at hub due to bad address")
+                        pkg.status = "Cancelled" if pkg.id in self.cancelled else "At Warehouse"
+                    truck.packages.clear()
+
+                # Check if more deliveries need to be made
+                if self.unavailable_locs or self.available_locs:
+                    # Try to reload & drive. Locations held back for having no deadline are let go once there are
+                    # no packages left to wait on
+                    routed = self.create_route(truck)
+                    if not routed and self.unavailable_locs and self.checkup_time == NEVER:
+                        self.group_locs(clock)
+                        routed = self.create_route(truck)
+                    if routed:
+                        if self.verbose:
+                            print(timedelta(seconds=clock))
+                        pkg = truck.packages[0]
+                        truck.drive(pkg.loc)
+                    # If you can't, wait for available packages
+                    elif self.unavailable_locs:
+                        truck.time = self.checkup_time
+                    # If there are no more packages, finished
+                    else:
+                        truck.done_at = truck.time
+                        truck.time = NEVER
+
+                # End of day
+                else:
+                    truck.done_at = truck.time
+                    truck.time = NEVER
+
+        # Drive to next package's location
+        else:
+            pkg = truck.packages[0]
+            if pkg.loc:
+                truck.drive(pkg.loc)
+            else:
+                truck.drive(0)
+
+    # Corrects a package's address at the given time. A package on a truck is delivered to the new address, and only
+    # that truck's remaining stops are replanned. A package at the hub is moved to the new location in the hub's queue
+    # Big-O: O(n^2 log n) for a truck's stops, O(n) at the hub
+    def change_address(self, clock, pkg_id, address, zip):
+        loc = self.map.lookup(address, zip)
+        if loc == -1:
+            raise Exception("Bad address given!")
+        pkg = self.update_pkg(clock, "address", pkg_id)
+        if pkg is None:
+            return
+        self.wrong_addresses.discard(pkg_id)
+        if pkg.ready == NEVER:
+            pkg.ready = 0   # It was being held for this correction
+        truck = self.carrier(pkg)
+        old = self.move_pkg(pkg, loc)
+        if truck:
+            self.group_pkgs(truck)
+        else:
+            self.leave_queue(old)
+            self.join_queue(pkg, clock)
+        # print("\nUpdated address for Pkg", pkg_id, ", ready for delivery\n")
+
+    # A package that hasn't left the hub won't get there until ready (in seconds). Its location waits with the other
+    # unavailable ones until the checkup at that time
+    # Big-O: O(n)
+    def delay_pkg(self, clock, pkg_id, ready):
+        pkg = self.update_pkg(clock, "delay", pkg_id)
+        if pkg is None:
+            return
+        if self.carrier(pkg):
+            self.stale_update(clock, "delay", pkg_id, "is already on a truck, it can't be delayed")
+            return
+        ready = to_seconds(ready)
+        pkg.ready = max(pkg.ready, ready)
+        if pkg.loc is not None and ready > clock:
+            self.leave_queue(pkg.loc, False)
+            self.join_queue(pkg, clock)
+
+    # Cancels a package. One on a truck is taken back to the hub (and the truck's stops are replanned), and one at the
+    # hub is taken out of the queue
+    # Big-O: O(n^2 log n) for a truck's stops, O(n) at the hub
+    def cancel_pkg(self, clock, pkg_id):
+        pkg = self.update_pkg(clock, "cancel", pkg_id)
+        if pkg is None:
+            return
+        self.cancelled.add(pkg_id)
+        self.wrong_addresses.discard(pkg_id)
+        truck = self.carrier(pkg)
+        old = self.move_pkg(pkg, None)
+        pkg.ready = NEVER
+        if truck:
+            truck.packages.remove(pkg)
+            truck.packages.append(pkg)  # Put package at end of list, truck will drop it off at hub
+            self.group_pkgs(truck)
+        else:
+            pkg.status = "Cancelled"
+            self.leave_queue(old)
+
+    # Looks up a package that an update is for. If it's already been delivered (or cancelled), the update is stale and
+    # None is returned; O(1)
+    def update_pkg(self, clock, kind, pkg_id):
+        pkg = self.pkgs.lookup(pkg_id)
+        if pkg is None:
+            raise Exception("Package #", pkg_id, "not found")
+        if self.pkgs.store.status[pkg.index] == DELIVERED or pkg_id in self.cancelled:
+            self.stale_update(clock, kind, pkg_id, "has already been delivered or cancelled")
+            return None
+        return pkg
+
+    # An update that came too late to apply raises in strict mode. Otherwise it's skipped and kept in stale_updates
+    # (and printed when verbose), and the day goes on without it; O(1)
+    def stale_update(self, clock, kind, pkg_id, reason):
+        if self.strict:
+            raise Exception("Package #", pkg_id, reason)
+        self.stale_updates.append((clock, kind, pkg_id, reason))
+        if self.verbose:
+            print("Skipped the", kind, "update for Pkg", pkg_id, "at", str(timedelta(seconds=clock)) + ": it", reason)
+
+    # The truck a package is loaded on, or None if it's at the hub; O(1)
+    def carrier(self, pkg):
+        store = self.pkgs.store
+        if store.status[pkg.index] == ON_TRUCK:
+            return self.trucks[int(store.status_arg[pkg.index]) - 1]
+        return None
+
+    # Moves a package to another location (None for no location), keeping loc_dictionary up to date. Returns the
+    # location it was at; O(p) for p packages at the old location
+    def move_pkg(self, pkg, loc):
+        old = pkg.loc
+        if old is not None:
+            self.pkgs.loc_dictionary[old].remove(pkg.id)
+        pkg.loc = loc
+        if loc is not None:
+            self.pkgs.loc_dictionary[loc].append(pkg.id)
+        return old
+
+    # The top group in the hub's queue that holds a location, or None; O(n)
+    def queued_group(self, loc_id):
+        for group in self.top_groups:
+            if loc_id in group.locs:
+                return group
+        return None
+
+    # A hub package has left a location. If nothing is left to deliver there (or if empty is False), the location is
+    # taken out of the queue, and the rest of its group is regrouped. Otherwise its group just has one less package
+    # Big-O: O(n^2 log n) for the group's locations
+    def leave_queue(self, loc_id, empty=True):
+        if loc_id is None:
+            return
+        group = self.queued_group(loc_id)
+        if empty and self.pkgs.loc_dictionary[loc_id]:
+            if group:
+                group.pkg_size -= 1
+            return
+        if loc_id in self.available_locs:
+            self.available_locs.remove(loc_id)
+        if loc_id in self.unavailable_locs:
+            self.unavailable_locs.remove(loc_id)
+        if group:
+            self.top_groups.remove(group)
+            rest = [loc for loc in group.locs if loc != loc_id]
+            if len(rest) == 1:
+                self.create_single_group(rest[0], rest, {})
+            elif rest:
+                self.group_shortest_edges(rest, True)   # The new top group joins the queue
+
+    # A hub package has arrived at its location (a new address, or a delay). A package that isn't ready yet, or
+    # doesn't have a deadline while the day is still waiting on others, waits with the unavailable locations for the
+    # next checkup. Otherwise it joins its location's group, if that group can still take it and go on the same truck,
+    # or its location is queued in the closest group with room for it (or a group of its own)
+    # Big-O: O(n)
+    def join_queue(self, pkg, clock):
+        loc = self.map.locations[pkg.loc]
+        loc.routed = False
+        loc.add_deadline(pkg.deadline)
+        if pkg.cluster:
+            loc.clustered = True
+        if pkg.truck:
+            loc.truck = pkg.truck
+        if pkg.ready > clock:
+            loc.ready = max(loc.ready, pkg.ready)
+            self.checkup_time = min(self.checkup_time, pkg.ready)
+
+        group = self.queued_group(loc.id)
+        if group:
+            if pkg.ready <= clock and group.pkg_size < self.max_packages and \
+                    (not pkg.truck or not group.truck or pkg.truck == group.truck):
+                group.pkg_size += 1
+                group.truck = group.truck or pkg.truck
+                if pkg.deadline and (not group.deltime or pkg.deltime < group.deltime):
+                    group.deltime = pkg.deltime
+                return
+            self.leave_queue(loc.id, False)
+
+        if loc.id in self.unavailable_locs:
+            return
+        if pkg.ready > clock or not loc.deadline and self.checkup_time < NEVER:
+            if loc.id in self.available_locs:
+                self.available_locs.remove(loc.id)
+            self.unavailable_locs.append(loc.id)
+            return
+        if loc.id not in self.available_locs:
+            self.available_locs.append(loc.id)
+
+        # Queue the location in the closest group that has room for it and goes on the same truck
+        group = self.create_single_group(loc.id, [loc.id], {})
+        row = self.map.distances[loc.id]
+        closest = None
+        for other in self.top_groups:
+            if other is group or other.pkg_size + group.pkg_size > self.max_packages:
+                continue
+            if other.truck and group.truck and other.truck != group.truck:
+                continue
+            if closest is None or row[other.center] < row[closest.center]:
+                closest = other
+        if closest:
+            self.combine_groups(closest, group)
+
+    # Orders the locations of a route for a truck leaving from_vertex. Uses the exact solver when it's turned on and the
+    # route is small enough (and has an on-time order), otherwise make_path, followed by local search if it's turned on
+    # Big-O: O(n log n) for make_path, O(2^n * n^2) for the exact solver
+    def plan_path(self, route, truck, from_vertex):
+        route.make_path(from_vertex, self.map)     # O(n log n)
+        path = None
+        if self.exact_routes and len(route.locs) <= self.exact_max_stops:
+            path = solve_exact(route.locs, from_vertex, truck.speed, truck.time)
+        if path:
+            route.locs = path
+        elif self.improve_routes:
+            route.locs = improve_path(route.locs, from_vertex, truck.speed, truck.time, self.improve_budget)
+
+    # Re-routes a truck while it's already making deliveries: its remaining stops are grouped and pathed again from the
+    # stop it's driving to, and its packages are put in that order (packages going back to the hub last)
+    # Big-O: O(n^2 log n)
+    def group_pkgs(self, truck):
+        locs = []
+        for pkg in truck.packages:
+            if pkg.loc is not None and not locs.__contains__(pkg.loc):
+                locs.append(pkg.loc)
+        if len(locs) > 1:
+            group = self.group_shortest_edges(locs, True)    # O(n^2 log n)
+            self.top_groups.remove(group)   # It's this truck's route, not part of the hub's queue
+            self.plan_path(group, truck, truck.loc)
+            locs = group.locs
+        order = {loc: i for i, loc in enumerate(locs)}
+        order[truck.loc] = -1   # Deliver what's due where the truck is headed first
+        truck.packages = deque(sorted(truck.packages, key=lambda pkg: order.get(pkg.loc, len(locs))))
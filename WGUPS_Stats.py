@@ -0,0 +1,204 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# WGUPS_Stats.py:   Optional instrumentation for a day's planning and simulation: the wall time of each phase and of the
+#                   main planning functions, counts of hot calls (nearest-location searches, group center updates, group
+#                   merges, hash table probes), and a cProfile capture. Nothing is patched in until a Stats is started,
+#                   so a day run without one costs exactly what it did before
+
+from WGUPS_Scenario import Scenario
+from WGUPS_Objects import LocGroup, Map, PkgHashTable
+from time import perf_counter
+import cProfile
+import pstats
+import io
+
+# The functions whose calls and wall time are recorded, as (class, method name)
+default_timed = ((Scenario, "group_locs"), (Scenario, "group_shortest_edges"), (Scenario, "create_route"),
+                 (LocGroup, "make_path"), (Scenario, "simulate"))
+
+
+# Records one day's performance while started. phases are the Scenario's setup timings (load is the ingest of the map
+# and packages); functions hold the calls and seconds of each timed function; counters hold the hot call counts.
+# Starting patches the classes themselves, so only one Stats can be started at a time
+class Stats:
+    started_stats = None    # The Stats that's patched in, if any
+
+    def __init__(self, profile=False, timed=default_timed):
+        self.timed = timed
+        self.phases = {}
+        self.chain_lengths = {}     # The package table's probe chain lengths at the end of the day
+        self.calls = {name: 0 for cls, name in timed}
+        self.seconds = {name: 0.0 for cls, name in timed}
+        self.counters = {"nearest": 0, "min_dist": 0, "center_updates": 0, "combine_groups": 0, "lookups": 0,
+                         "lookup_probes": 0, "longest_probe": 0}
+        self.profiler = cProfile.Profile() if profile else None
+        self.originals = []     # (class, name, function) for everything that's been patched
+
+    # Patches the timed and counted functions, and starts the profiler if there is one; O(1)
+    def start(self):
+        if Stats.started_stats:
+            raise Exception("Stats are already being recorded")
+        Stats.started_stats = self
+        for cls, name in self.timed:
+            self.patch(cls, name, self.time_calls)
+        searching = [0]     # Shared by the map searches, since min_dist is made of a call to nearest
+        self.patch(Map, "nearest", lambda name, function: self.count_calls(name, function, searching))
+        self.patch(Map, "min_dist", lambda name, function: self.count_calls(name, function, searching))
+        self.patch(Scenario, "combine_groups", self.count_calls)
+        self.patch(LocGroup, "add", self.count_center_updates)
+        collisions = [0]    # Counted by the probe wrapper, and read by the lookup wrapper around it
+        self.patch(PkgHashTable, "probe", lambda name, function: self.count_collisions(collisions))
+        self.patch(PkgHashTable, "lookup", lambda name, function: self.count_probes(name, function, collisions))
+        if self.profiler:
+            self.profiler.enable()
+        return self
+
+    # Stops the profiler and puts the original functions back; O(1)
+    def stop(self):
+        if self.profiler:
+            self.profiler.disable()
+        while self.originals:
+            cls, name, function = self.originals.pop()
+            setattr(cls, name, function)
+        if Stats.started_stats is self:
+            Stats.started_stats = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Sets up the scenario and runs its day up to status_time with the stats started, then keeps its phase timings
+    # (the phases it finished, if it fails) and the chain lengths of its package table. Returns the scenario
+    # Big-O: O(n^3)
+    def run(self, scenario, status_time="End of Day"):
+        with self:
+            try:
+                scenario.setup(status_time)
+            finally:
+                self.phases = dict(scenario.timings)
+                self.chain_lengths = chain_lengths(scenario.pkgs)
+        return scenario
+
+    # Replaces cls.name with the wrapper that make_wrapper builds for it; O(1)
+    def patch(self, cls, name, make_wrapper):
+        function = cls.__dict__[name]
+        self.originals.append((cls, name, function))
+        setattr(cls, name, make_wrapper(name, function))
+
+    # A wrapper that adds the outermost calls of function to calls and seconds. A call made from inside another call of
+    # the same function (group_locs grouping the cluster) is part of the outer call, so it's only counted once; O(1)
+    def time_calls(self, name, function):
+        depth = [0]
+
+        def timed_function(*args, **kwargs):
+            if depth[0]:
+                return function(*args, **kwargs)
+            depth[0] += 1
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[name] += perf_counter() - started
+                self.calls[name] += 1
+                depth[0] -= 1
+        return timed_function
+
+    # A wrapper that counts every call of function. Wrappers given the same depth list only count the outermost of their
+    # calls, so a call one of them makes to another (min_dist calling nearest) is counted once, where it started; O(1)
+    def count_calls(self, name, function, depth=None):
+        counters = self.counters
+        if depth is None:
+            def counted_function(*args, **kwargs):
+                counters[name] += 1
+                return function(*args, **kwargs)
+            return counted_function
+
+        def outer_counted_function(*args, **kwargs):
+            if not depth[0]:
+                counters[name] += 1
+            depth[0] += 1
+            try:
+                return function(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        return outer_counted_function
+
+    # A wrapper for LocGroup.add that counts the adds that have to find a new center (every add after the first); O(1)
+    def count_center_updates(self, name, function):
+        counters = self.counters
+
+        def add(group, *args, **kwargs):
+            if group.center is not None:
+                counters["center_updates"] += 1
+            return function(group, *args, **kwargs)
+        return add
+
+    # A stand-in for PkgHashTable.probe that adds the occupied slots it steps past to collisions[0]. The table's own
+    # probe doesn't count them, so a day run without stats doesn't pay for it; O(1) avg
+    @staticmethod
+    def count_collisions(collisions):
+        def probe(table, key, key_hash):
+            return counted_probe(table, key, key_hash, collisions)
+        return probe
+
+    # A wrapper for PkgHashTable.lookup that counts the slots each lookup probes (one, plus the collisions counted
+    # during it), and the longest probe so far; O(1) avg
+    def count_probes(self, name, function, collisions):
+        counters = self.counters
+
+        def lookup(table, id):
+            before = collisions[0]
+            pkg = function(table, id)
+            probes = 1 + collisions[0] - before
+            counters["lookups"] += 1
+            counters["lookup_probes"] += probes
+            if probes > counters["longest_probe"]:
+                counters["longest_probe"] = probes
+            return pkg
+        return lookup
+
+    # Everything recorded, as a dictionary of plain values (for JSON). The profile is the report of the slowest
+    # functions by cumulative time, if it was captured; O(1)
+    def to_dict(self, profile_limit=20):
+        functions = {name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)}
+                     for cls, name in self.timed}
+        return {"phases": {phase: round(seconds, 6) for phase, seconds in self.phases.items()},
+                "functions": functions, "counters": dict(self.counters),
+                "chain_lengths": {str(length): count for length, count in self.chain_lengths.items()},
+                "profile": self.profile_report(profile_limit) if self.profiler else None}
+
+    # The profiler's report of the limit slowest functions, sorted by sort (any pstats sort key); O(n log n)
+    def profile_report(self, limit=20, sort="cumulative"):
+        if not self.profiler:
+            raise Exception("No profile was captured, make the Stats with profile=True")
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+# PkgHashTable.probe, adding each occupied slot it steps past to collisions[0]. Returns the slot; O(1) avg
+def counted_probe(table, key, key_hash, collisions):
+    mask = table.arr_size - 1
+    perturb = key_hash & 0xFFFFFFFFFFFFFFFF
+    slot = perturb & mask
+    while True:
+        entry = table.slots[slot]
+        if entry == -1 or (table.hashes[entry] == key_hash and table.ids[entry] == key):
+            return slot
+        collisions[0] += 1
+        perturb >>= 5
+        slot = (slot * 5 + perturb + 1) & mask
+
+
+# The probe chain length of every package in the table, as {length: how many packages}, from the collisions counted
+# while probing for each one; O(n)
+def chain_lengths(table):
+    lengths = {}
+    for id in table.ids:
+        collisions = [0]
+        counted_probe(table, id, hash(id), collisions)
+        lengths[1 + collisions[0]] = lengths.get(1 + collisions[0], 0) + 1
+    return dict(sorted(lengths.items()))
@@ -0,0 +1,135 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# WGUPS_Sweep.py:   Runs a grid of scenarios (truck counts, speeds, capacities and start times) across worker
+#                   processes, and totals up the miles, lateness and makespan of each, for planning the fleet size
+
+from WGUPS_Scenario import Scenario
+from WGUPS_Objects import time_seconds, slc_updates
+from WGUPS_Loader import load_updates_file
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import argparse
+import json
+import os
+
+
+# Every combination of the given settings, as a list of Scenario arguments. Start times may be seconds or clock
+# strings like "8:00 am"; any other keyword (pkg_file, exact_routes...) is passed to every scenario; O(n)
+def make_grid(num_trucks=(2,), truck_speeds=(18.0,), max_packages=(16,), start_times=("8:00 am",), **settings):
+    configs = []
+    for trucks, speed, capacity, start in product(num_trucks, truck_speeds, max_packages, start_times):
+        config = dict(settings)
+        config.update(num_trucks=trucks, truck_speed=speed, max_packages=capacity, start_time=start)
+        configs.append(config)
+    return configs
+
+
+# Runs one full day in this process, without printing, and returns the config with its results. A day that
+# can't be finished is reported with its error rather than stopping the sweep; O(n^3)
+def run_config(config):
+    result = dict(config)
+    settings = dict(config)
+    if isinstance(settings["start_time"], str):
+        settings["start_time"] = time_seconds(settings["start_time"])
+    try:
+        scenario = Scenario(strict=False, verbose=False, **settings).setup("End of Day")
+        result.update(scenario.results())
+        result["error"] = None
+    except Exception as error:
+        result["error"] = type(error).__name__ + ": " + str(error)
+    return result
+
+
+# Runs every config across a pool of worker processes (os.cpu_count() by default), returning results in config order.
+# Configs are handed out in chunks so short days don't spend their time waiting on the pool
+# Big-O: O(c * n^3 / w) for c configs and w workers
+def run_sweep(configs, workers=None, chunk_size=None):
+    if not configs:
+        return []
+    if workers == 1:
+        return [run_config(config) for config in configs]
+    if chunk_size is None:
+        chunk_size = max(1, len(configs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(run_config, configs, chunksize=chunk_size))
+
+
+# Totals the sweep's results for each value of key (num_trucks by default): how many runs finished, how many of those
+# were on time, and the best and average miles, lateness and makespan; O(c)
+def summarize(results, key="num_trucks"):
+    summary = {}
+    for result in results:
+        entry = summary.setdefault(result[key], {key: result[key], "runs": 0, "failed": 0, "on_time": 0,
+                                                 "total_miles": [], "lateness_minutes": [], "makespan_hours": []})
+        entry["runs"] += 1
+        if result["error"]:
+            entry["failed"] += 1
+            continue
+        if not result["late_packages"] and not result["undelivered"]:
+            entry["on_time"] += 1
+        for field in ("total_miles", "lateness_minutes", "makespan_hours"):
+            if result[field] is not None:
+                entry[field].append(result[field])
+
+    rows = []
+    for value in sorted(summary):
+        entry = summary[value]
+        for field in ("total_miles", "lateness_minutes", "makespan_hours"):
+            values = entry.pop(field)
+            entry["min_" + field] = min(values) if values else None
+            entry["avg_" + field] = round(sum(values) / len(values), 3) if values else None
+        rows.append(entry)
+    return rows
+
+
+# Prints one line per result, in the order of the grid; O(c)
+def print_results(results):
+    print("Trucks\tSpeed\tCap\tStart\t\tMiles\tLate\tLate min\tUndelivered\tMakespan h")
+    for result in results:
+        print(result["num_trucks"], result["truck_speed"], result["max_packages"], str(result["start_time"]), "",
+              sep="\t", end="\t")
+        if result["error"]:
+            print("failed:", result["error"])
+        else:
+            print(result["total_miles"], result["late_packages"], result["lateness_minutes"], "",
+                  result["undelivered"], "", result["makespan_hours"], sep="\t")
+
+
+# Splits a comma separated command line value into a list of the given type; O(n)
+def split_list(kind):
+    return lambda value: [kind(item.strip()) for item in value.split(",") if item.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of WGUPS scenarios across worker processes")
+    parser.add_argument("--trucks", type=split_list(int), default=[2], help="truck counts, e.g. 1,2,3")
+    parser.add_argument("--speeds", type=split_list(float), default=[18.0], help="truck speeds in mph")
+    parser.add_argument("--capacities", type=split_list(int), default=[16], help="packages per truck")
+    parser.add_argument("--starts", type=split_list(str), default=["8:00 am"], help='start times, e.g. "8:00 am"')
+    parser.add_argument("--pkg-file", help="package manifest (XLSX, CSV or JSONL)")
+    parser.add_argument("--distance-file", help="distance table (XLSX or CSV)")
+    parser.add_argument("--updates", help="mid-day package updates (CSV or JSONL), for a package file's day")
+    parser.add_argument("--improve", action="store_true", help="run 2-opt/Or-opt on each route")
+    parser.add_argument("--exact", action="store_true", help="solve small routes exactly")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--json", help="write the results and summary to this file")
+    args = parser.parse_args()
+
+    if args.updates:
+        updates = load_updates_file(args.updates)
+    else:
+        updates = slc_updates if args.pkg_file is None else []     # The built-in packages come with their updates
+    grid = make_grid(args.trucks, args.speeds, args.capacities, args.starts, pkg_file=args.pkg_file,
+                     distance_file=args.distance_file, improve_routes=args.improve, exact_routes=args.exact,
+                     updates=updates)
+    sweep = run_sweep(grid, args.workers)
+    print_results(sweep)
+    totals = summarize(sweep)
+    print("\nTrucks\tRuns\tFailed\tOn time\tBest miles\tBest makespan h")
+    for row in totals:
+        print(row["num_trucks"], row["runs"], row["failed"], row["on_time"], row["min_total_miles"], "",
+              row["min_makespan_hours"], sep="\t")
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({"results": sweep, "summary": totals}, out, indent=2, default=str)
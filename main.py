@@ -16,755 +16,158 @@
 # which packages are at the hub, and which are en route. The intent is to use this program for this specific location
 # and to use the same program in different cities as WGUPS expands its business.
 
-from WGUPS_Objects import Truck, Map, PkgHashTable, load_pkgs, LocGroup, Location
-from datetime import timedelta
+from WGUPS_Scenario import Scenario
+from WGUPS_Stats import Stats
+from WGUPS_Objects import time_seconds, slc_updates
+from WGUPS_Loader import load_updates_file
+from time import perf_counter
+import argparse
+import csv
+import json
+import sys
 
 # Define universal variables that will be needed to run a scenario
 num_trucks = 2
 truck_speed = 18.0
 max_packages = 16  # per truck
-start_time = timedelta(hours=8)
-hash_tbl_size = 16
-group_num = -1
-map = Map()
-pkgs = PkgHashTable(1)
-groups = []            # A list of all groups
-top_groups = []        # A list of only groups that aren't contained by another group
-trucks = []
-available_locs = []     # A list of locations that have only available packages
-unavailable_locs = []   # A list of locations that have an unavailable package
-checkup_time = timedelta(days=99)   # A time to check on our unavailable packages
-full_cluster = []
-
-# * * * * *   Simulate Function   * * * * * #
-# Simulates the WGUPS workday, printing package status updates between 2 given times. This function
-# is the "clock" of the simulation, its only logic is to make sure the timeline is correct. Other functions are used for
-# the actual algorithm
-# Big-O: O(n^3)
+start_time = 8 * 3600  # seconds after midnight (8:00 am)
+pkg_file = None        # A package manifest (XLSX, CSV or JSONL) to load, or None for the built-in packages
+distance_file = None   # A distance table (XLSX or CSV) to load, or None for the built-in Salt Lake City map
+improve_routes = False  # Shorten each route with 2-opt/Or-opt moves after make_path
+improve_budget = 0.05   # Seconds of local search allowed per route
+exact_routes = False    # Solve routes with few enough stops exactly (Held-Karp) instead of with make_path
+exact_max_stops = 12    # The most stops a route can have to be solved exactly
+hash_tbl_size = 16     # Starting capacity of the package hash table (it grows as needed)
+updates = None         # Mid-day package updates (address corrections, delays, cancellations), or None for the
+                       # built-in packages' own (see day_updates)
+day = None             # The last full day simulated, which status queries are answered from
+
+
+# Prints the package statuses at status_time. "End of Day" simulates a full day with the variables above (printing
+# each delivery), and any other time is looked up in the last full day, which is simulated quietly the first time
+# Big-O: O(n^3) to simulate the day, O(n log k) for each status query after that
 def setup(status_time):
-    global pkgs
-    global trucks
-    global full_cluster
-    global available_locs
-    global unavailable_locs
-    # Instantiate all variables
-    if status_time == "End of Day":
-        status_time = timedelta(days=99)
-    available_locs = []
-    unavailable_locs = []
-    trucks = []
-    for i in range(num_trucks):
-        trucks.append(Truck(i+1, truck_speed, max_packages, start_time))
-    pkgs = PkgHashTable(16)
-    load_pkgs(pkgs)
-
-    # Get all of the cluster to hold the same data O(n)
-    cluster = None
-    for pkg in pkgs:
-        if manage_clusters(pkg):
-            cluster = manage_clusters(pkg)  # We do it twice so the entire cluster has the same data
-    if cluster:
-        for pkg in cluster:
-            pkg = pkgs.lookup(pkg)
-            pkg.cluster = cluster
-            map.locations[pkg.loc].clustered = True
-        full_cluster = cluster
+    global day
+    if status_time == "End of Day" or day is None:
+        day = Scenario(num_trucks, truck_speed, max_packages, start_time, pkg_file, distance_file, improve_routes,
+                       improve_budget, exact_routes, exact_max_stops, hash_tbl_size,
+                       verbose=status_time == "End of Day", updates=day_updates(pkg_file, updates))
+        day.setup("End of Day")
 
-    # 1- Group locations and load trucks with their packages
-    group_locs(start_time)
-    for truck in trucks:
-        create_route(truck)  # O(n^3)
-
-    # 2- Initiate simulation, keeping track of the time
-    simulate(status_time)
-
-    # Status Report
-    print("\n\n\nStatuses at ", status_time)
-    for pkg in pkgs:
-        print(pkg)
-    total_miles = 0
-    for truck in trucks:
-        total_miles += truck.miles
-        print("Truck", truck.id, "has driven", round(truck.miles, 1), "miles")
-    print("Total miles:", round(total_miles, 2))
+    if status_time == "End of Day":
+        day.report()
+    else:
+        day.report(status_time)
 
     # Wait for user to continue
     print("Press enter to continue...", end='')
     input()
     print("\n\n")
+    return day
 
 
-# A recursive algorithm that manages package clusters
-# Big-O: O(n)
-def manage_clusters(given, cluster=None, visited=None):
-    # If this package's cluster is None
-    if not given.cluster:
-        # If this package's cluster is empty, set it to the given cluster with its ID
-        if not cluster:
-            return
-        elif not cluster.__contains__(given.id):
-            cluster.append(given.id)
-            given.cluster = cluster
-            return cluster
-
-    if not visited:
-        visited = []
-        cluster = []
-    visited.append(given.id)
-
-    if not cluster.__contains__(given.id):
-        cluster.append(given.id)
-
-    # Recursively visit all in the cluster
-    for pkg in given.cluster:
-        if not visited.__contains__(pkg):
-            pkg = pkgs.lookup(pkg)
-            new_cluster = manage_clusters(pkg, cluster, visited)
-            for p in new_cluster:
-                if not cluster.__contains__(p):
-                    cluster.append(p)
-    given.cluster = cluster
-    return cluster
-
-
-# The algorithm that assigns packages based on location
-# Big-O: O(n^3)
-def group_locs(time, locs=None):
-    # Create variables needed for this method
-    global full_cluster
-    group_lookup = {}  # A dictionary of all group objects, with all ids pointing to their group
-    if locs:
-        ungrouped = locs  # A list of Location ids that haven't been grouped yet
-    else:
-        check_pkg_availability(time)
-        ungrouped = available_locs.copy()  # A list of Location ids that haven't been grouped yet
-
-    # Check if only one location is available
-    if len(ungrouped) == 1:
-        group = LocGroup(get_group_num())
-        loc = map.locations[ungrouped[0]]
-        group.add(loc.id, len(pkgs.loc_dictionary[loc.id]), loc.truck, loc.deltime)
-        group_lookup[loc.id] = group
-        ungrouped.remove(loc.id)
-        groups.append(group)
-        top_groups.append(group)
-        return
-
-    # Make the cluster into a special group
-    if full_cluster:
-        cluster_locs = []
-        # There can't be a package that is both unavailable and clustered, so group immediately
-        # are delivered to it
-        for pkg in full_cluster:
-            pkg = pkgs.lookup(pkg)
-            # Get all the locations for the pkgs in the cluster
-            if not cluster_locs.__contains__(pkg.loc):
-                cluster_locs.append(pkg.loc)
-            # Remove this loc from ungrouped for this frame (it'll be grouped in its own frame)
-            if ungrouped.__contains__(pkg.loc):
-                ungrouped.remove(pkg.loc)
-        full_cluster = None
-        group_locs(time, cluster_locs)  # Group only the cluster locs
-
-    # Make sure all locations are in a group, starting with shortest edges
-    group_shortest_edges(ungrouped, False, group_lookup)    # O(n^3)
-
-    # Make a new array of small groups that we can remove when they become too large in next block
-    small_groups = []
-    smallest_size = None    # The group with the smallest size (to help us know when to eliminate a large group)
-    for group in top_groups:
-        small_groups.append(group)
-        if smallest_size is None:
-            smallest_size = group.pkg_size
-        else:
-            smallest_size = min(group.pkg_size, smallest_size)
-    # Make sure all groups in small_groups have size + smallest_size <= max_packages
-    for group in small_groups:
-        if group.pkg_size + smallest_size > max_packages:
-            small_groups.remove(group)
-
-    # Combine groups when able; O(n^3)
-    while len(small_groups) > 1:
-        # Create arrays that have the same index for corresponding data (we have to do this every loop because the
-        # centers change every time groups are merged, but their length is already small and decreases by 1 every time)
-        centers = []  # Holds the ids of all top_groups centers
-        closest_ctr = []  # Holds closest center       closest_ctr[row][pair](vertex, distance)
-        distances = []  # Holds the first distance in the closest_ctr
-
-        # Populate centers
-        for g in small_groups:
-            centers.append(g.center)
-
-        # Populate closest_ctr & distances
-        for row in range(len(small_groups)):
-            closest_ctr.append(map.min_dist(small_groups[row].center, centers))
-            distances.append(closest_ctr[row][0][1])
-            # print("Gp", small_groups[row].id, "Ctr", centers[row], ":\t", closest_ctr[row])    # Debug print
-
-        # Find indexes for lowest distance, and the pair to the vertex with the lowest distance
-        min_d = min(distances)
-        index_1 = distances.index(min_d)
-        index_2 = centers.index(closest_ctr[index_1][0][0])
-        # Get closest top groups a,b
-        a = small_groups[index_1]
-        b = small_groups[index_2]
-
-        # Get a new pair if the groups are not combinable (pkg_size limit or truck requirements)
-        while a.pkg_size + b.pkg_size > max_packages or a.truck != b.truck:
-            # There's a bad pairing, remove it from closest_centers and re-do distances
-            closest_ctr[index_1].pop(0)
-            if closest_ctr[index_1]:
-                distances[index_1] = closest_ctr[index_1][0][1]
-            # If there's no more pairings left for this group, remove it from everything
-            else:
-                small_groups.remove(a)
-                centers.pop(index_1)
-                closest_ctr.pop(index_1)
-                distances.pop(index_1)
-                index_2 -= 1    # Decrement because index_1, which is less than index_2, has been removed
-
-            closest_ctr[index_2].pop(0)
-            if closest_ctr[index_2]:
-                distances[index_2] = closest_ctr[index_2][0][1]
-            # If there's no more pairings left for this group, remove it from everything
-            else:
-                small_groups.remove(b)
-                centers.pop(index_2)
-                closest_ctr.pop(index_2)
-                distances.pop(index_2)
+# The updates a day gets: the given ones, or if none are given, the ones that go with its packages. The built-in
+# packages come with slc_updates (package 9's address correction); a package file's updates have to be given, such as
+# "WGUPS Updates.csv" for the WGUPS Package File; O(1)
+def day_updates(pkg_file, updates):
+    if updates is not None:
+        return updates
+    return slc_updates if pkg_file is None else []
 
-            # If we're finished combining all groups we can, centers will be empty
-            if not centers:
-                break
 
-            # Find indexes for lowest distance, and the pair to the vertex with the lowest distance
-            min_d = min(distances)
-            index_1 = distances.index(min_d)
-            index_2 = centers.index(closest_ctr[index_1][0][0])
-            # Get closest top groups a,b
-            a = small_groups[index_1]
-            b = small_groups[index_2]
-
-        # If we're finished combining all groups we can, centers will be empty
-        if not centers:
-            break
-
-        small_groups.remove(a)
-        small_groups.remove(b)
-        group = combine_groups(a, b)    # O(n^2)
-
-        # Add new group to small_groups if it's still small enough to be combined
-        if group.pkg_size + smallest_size <= max_packages:
-            small_groups.append(group)
-
-        # Update smallest_size
-        if a.pkg_size == smallest_size or b.pkg_size == smallest_size:
-            smallest_size = group.pkg_size
-            for g in small_groups:
-                smallest_size = min(smallest_size, g.pkg_size)
-        # print("Combined groups", a.id, ",", b.id, "at distance of", min(distances))  # Debug print
-    return
-
-
-# Takes a list of locations and groups by shortest edges
+# Simulates a full day without printing or waiting for input, for scripts, batch jobs and benchmarks. Any of the
+# variables above can be given by keyword (num_trucks=3, ...). Returns the scenario, its totals, the wall-clock seconds
+# of each phase, and (if times are given, in seconds after midnight) a StatusTable of every package at each time. If
+# a Stats is given, the day is recorded with it and its results are returned too
 # Big-O: O(n^3)
-def group_shortest_edges(ungrouped, fully_group, group_lookup={}):
-    print("\n\nCalled group_shortest_edges\n\n")
-    these_groups = []
-    # Sort edges by length
-    edges = {}  # A dictionary that maps edge lengths to all vertex pairs with that length. edges[7.1]:[[2,1], [17,16]]
-    # Traverse all distances diagonally, so that row is always greater than col, O(n^2)
-    for v1 in ungrouped:
-        for v2 in ungrouped:
-            if v2 == v1:
-                break
-            key = map.distances[v1][v2]
-            if edges.__contains__(key):
-                edges[key].append([v1, v2])
-            else:
-                edges[key] = [[v1, v2]]
-    keys = sorted(edges.keys())     # O(n log n)
-
-    # Group shortest edges; O(n^3)
-    for length in keys:  # We won't actually visit all edges
-        # Extract each vertex with this length
-        vertices = edges[length]
-        for vertex in vertices:
-            v1 = vertex[0]
-            v2 = vertex[1]
-
-            if fully_group:
-                # Add vertices to a group if one is still ungrouped
-                if ungrouped.__contains__(v1) or ungrouped.__contains__(v2):
-                    these_groups = create_group(v1, v2, ungrouped, group_lookup)    # O(n^2)
-                # Combine groups if no location is ungrouped
-                if not ungrouped:
-                    g1 = get_top_group(group_lookup[v1])                        # O(n)
-                    g2 = get_top_group(group_lookup[v2])
-                    if g1 is not g2:
-                        these_groups = combine_groups(g1, g2)  # If fully_group, we only need the top group
-            else:
-                # Add vertices to a group if one is still ungrouped
-                if ungrouped.__contains__(v1) or ungrouped.__contains__(v2):
-                    group = create_group(v1, v2, ungrouped, group_lookup)    # O(n^2)
-                    these_groups.append(group)
-
-            # Added. Now check if we need to escape loops
-            if not fully_group and len(ungrouped) == 0:
-                break
-        if not fully_group and len(ungrouped) == 0:
-            break
-
-    return these_groups
-
-
-# A method that adds two locations to a single group, or groups one vertex with another group. l1 and l2 must be
-# location IDs. Combines groups, do not use on a loop!
-# Big-O: O(n^2)
-def create_group(l1, l2, ungrouped=[], group_lookup=None):
-
-    # Add the two objects in one group
-    if ungrouped.__contains__(l1):
-
-        # Group v1 and v2 in new group
-        if ungrouped.__contains__(l2):
-            group = LocGroup(get_group_num())
-            loc1 = map.locations[l1]
-            loc2 = map.locations[l2]
-            truck = get_truck_req(loc1, loc2)
-            group.add(l1, len(pkgs.loc_dictionary[l1]), truck, loc1.deltime)
-            group.add(l2, len(pkgs.loc_dictionary[l2]), truck, loc2.deltime)
-            group_lookup[l1] = group
-            group_lookup[l2] = group
-            ungrouped.remove(l1)
-            ungrouped.remove(l2)
-            groups.append(group)
-            top_groups.append(group)
-            return group
-
-        # Create new group for v1 containing v2's group
-        else:
-            v2_group = group_lookup[l2]
-            v2_group = get_top_group(v2_group)  # Only deal with top groups
-            group = LocGroup(get_group_num())
-            loc1 = map.locations[l1]
-            truck = get_truck_req(loc1, v2_group)
-            group.add(l1, len(pkgs.loc_dictionary[l1]), truck, loc1.deltime)
-            group.add(v2_group, v2_group.pkg_size, truck, v2_group.deltime)
-            v2_group.part_of_group = group.id
-            group_lookup[l1] = group
-            ungrouped.remove(l1)
-            groups.append(group)
-            top_groups.remove(v2_group)
-            top_groups.append(group)
-            return group
-
-    # Create new group for v1 containing v2's group
-    elif ungrouped.__contains__(l2):
-        v1_group = group_lookup[l1]
-        v1_group = get_top_group(v1_group)  # Only deal with top groups
-        group = LocGroup(get_group_num())
-        loc2 = map.locations[l2]
-        truck = get_truck_req(v1_group, loc2)
-        group.add(l2, len(pkgs.loc_dictionary[l2]), truck, loc2.deltime)
-        group.add(v1_group, v1_group.pkg_size, truck, v1_group.deltime)
-        v1_group.part_of_group = group.id
-        group_lookup[l2] = group
-        ungrouped.remove(l2)
-        groups.append(group)
-        top_groups.remove(v1_group)
-        top_groups.append(group)
-        return group
-
+def run(times=(), strict=True, stats=None, **settings):
+    config = {"num_trucks": num_trucks, "truck_speed": truck_speed, "max_packages": max_packages,
+              "start_time": start_time, "pkg_file": pkg_file, "distance_file": distance_file,
+              "improve_routes": improve_routes, "improve_budget": improve_budget, "exact_routes": exact_routes,
+              "exact_max_stops": exact_max_stops, "hash_tbl_size": hash_tbl_size, "updates": updates}
+    for name in settings:
+        if name not in config:
+            raise Exception("Unknown setting", name)
+    config.update(settings)
+    config["updates"] = day_updates(config["pkg_file"], config["updates"])
+
+    scenario = Scenario(strict=strict, verbose=False, **config)
+    if stats:
+        stats.run(scenario)
     else:
-        # Combine the group for v1 and v2
-        v1_group = group_lookup[l1]
-        v1_group = get_top_group(v1_group)  # Only deal with top groups
-        v2_group = group_lookup[l2]
-        v2_group = get_top_group(v2_group)  # Only deal with top groups
-        return combine_groups(v1_group, v2_group)
-
-
-# A method that combines two different groups into a single group. Differs from create_group because it requires groups
-# Big-O: O(n^2)
-def combine_groups(g1, g2):
-    if g1 == g2:
-        return g1
-    g1 = get_top_group(g1)
-    g2 = get_top_group(g2)
-    truck = get_truck_req(g1, g2)
-    group = LocGroup(get_group_num())
-    group.add(g1)
-    group.add(g2)
-    g1.part_of_group = group.id
-    g2.part_of_group = group.id
-    group.truck = truck
-    groups.append(group)
-    if top_groups.__contains__(g1):
-        top_groups.remove(g1)
-    if top_groups.__contains__(g2):
-        top_groups.remove(g2)
-    top_groups.append(group)
-    return group
-
-
-# Helper method for adding vertexes to groups
-# Big-O: O(n)
-def get_top_group(group):
-    while group.part_of_group is not None:
-        top = group.part_of_group
-        group = groups[top]
-    return group
-
-
-# A simple method to increment and return the group_num
-# Big-O: O(1)
-def get_group_num():
-    global group_num
-    group_num += 1
-    return group_num
-
-
-# A method to get the truck requirements from 2 items. Args may be a Location or a LocGroup
-# Big-O: O(1)
-def get_truck_req(arg_1, arg_2):
-    truck_1 = arg_1.truck
-    truck_2 = arg_2.truck
-    if truck_1 or truck_2:
-        if truck_1:
-            if truck_2:
-                if truck_1 != truck_2:
-                    raise Exception("Cannot combine groups with different trucks:", truck_1, "and", truck_2)
-                else:
-                    return truck_1
-            else:
-                return truck_1
-        else:
-            return truck_2
-    return None
-
-
-# Checks and updates packages based on their ready times, and updates available/unavailable locations
-# Big-O: O(n)
-def check_pkg_availability(time):
-    global checkup_time
-    global available_locs
-    global top_groups
-    global groups
-    global pkgs
-    global group_num
-    # Instantiate all variables
-    top_groups = []
-    groups = []
-    group_num = -1
-
-    # If this is the first checkup
-    if time == start_time:
-        for loc in map.locations:
-            # If the location has package that isn't ready, or if it doesn't have a deltime
-            if loc.ready_at and loc.ready_at > time or not loc.deltime:
-                if checkup_time and loc.ready_at:
-                    checkup_time = loc.ready_at
-                elif loc.ready_at:
-                    checkup_time = min(checkup_time, loc.ready_at)
-                unavailable_locs.append(loc.id)
-
-            # If the location is ready to go
-            else:
-                available_locs.append(loc.id)
-        # Remove home location
-        unavailable_locs.pop(0)
-
-    # If this is a midday checkup
-    else:
-        # Update checkup_time
-        if checkup_time <= time:
-            checkup_time = timedelta(days=99)
-            for loc in unavailable_locs:
-                loc = map.locations[loc]
-                if loc.ready_at and loc.ready_at > time:
-                    checkup_time = min(checkup_time, loc.ready_at)
-
-        # Update locations
-        for loc in map.locations:
-            # For unavailable locations
-            if unavailable_locs.__contains__(loc.id):
-                # If it's now ready, move to available locations
-                if loc.ready_at and loc.ready_at <= time or checkup_time == timedelta(days=99):
-                    available_locs.append(loc.id)
-                    unavailable_locs.remove(loc.id)
-
-            # For available locations, remove fully delivered locs and update others
-            elif loc.routed and available_locs.__contains__(loc.id):
-                available_locs.remove(loc.id)
-            else:
-                truck = None
-                deltime = None
-                for pkg in pkgs.loc_dictionary[loc.id]:
-                    pkg = pkgs.lookup(pkg)
-                    if pkg.truck and not truck:
-                        truck = pkg.truck
-                    if pkg.deltime:
-                        if deltime:
-                            deltime = min(deltime, pkg.deltime)
-                        else:
-                            deltime = pkg.deltime
-                loc.deltime = deltime
-                loc.truck = truck
-
-    return
-
-
-# Creates a route from top_groups for a truck with a given id
-# Big-O: O(n^3)
-def create_route(truck):
-    route_groups = []
-    num_pkgs = 0
-
-    # Debug print
-    # print("\nTruck", truck.id, "arrived at hub. Available groups:")
-    # for group in top_groups:
-    #     print(group.overview())
-
-    # Add package groups with correct truck requirements
-    for group in top_groups:
-        if not group.truck or group.truck == truck.id:
-            route_groups.append(group)
-            num_pkgs += group.pkg_size
-
-    # If we have multiple groups, find the best group to keep (the soonest delivery time that has a truck req)
-    route = None
-    if len(route_groups) > 1:
-        if num_pkgs > max_packages:
-            g1_time = timedelta(days=99)    # Since groups can have a None deltime, use an artificial "long" deltime
-            g2_time = timedelta(days=99)
-            best = None
-
-            # Find soonest delivery time; O(n^2), but probably a fraction of O(n) in practice
-            for g1 in route_groups:
-                # Set g1_time
-                if g1.deltime:
-                    g1_time = g1.deltime
-
-                # Compare deltimes between each group (only compare the same groups once)
-                for g2 in route_groups:
-                    if g1 == g2:
-                        break
-                    # Set g2_time
-                    if g2.deltime:
-                        g2_time = g2.deltime
-                    else:
-                        continue
-                    # Have best set to the group with the smallest time
-                    if g1_time < g2_time:
-                        if not best or not best.deltime or g1.deltime < best.deltime:
-                            best = g1
-                    elif g1_time > g2_time:
-                        if not best or not best.deltime or g2.deltime < best.deltime:
-                            best = g2
-
-                # Always give truck requirements priority
-                if g1.truck:
-                    if not best or not best.truck:
-                        best = g1
-
-            # Create the route
-            if best:
-                route = best
-            else:
-                route = route_groups[0]     # No timelies/truck reqs, so just assign it the first group
-
-        # If the truck can fit all packages
-        else:
-            locs = []
-            for group in route_groups:
-                for loc in group.locs:
-                    locs.append(loc)
-            route = group_shortest_edges(locs, True)    # O(n^3)
-
-    # If only one route was selected in route_groups
-    elif route_groups:
-        route = route_groups[0]
-    else:
-        # print("\nCould not find a suitable group for Truck", truck.id, "\n")
-        return
-
-    # Make a good path to traverse the route
-    route.make_path(0, map)     # O(n log n)
-
-    # Add all packages from all locations in the route; O(n)
-    for loc in route.locs:
-        # If it's clustered, don't add unavailable packages, and keep the loc available if there are any
-        if map.locations[loc].clustered:
-            all_pkgs_loaded = True
-            for pkg in pkgs.loc_dictionary[loc]:
-                pkg = pkgs.lookup(pkg)
-                # Load all available packages, flag if there's one that's unavailable
-                if not pkg.ready_at or pkg.ready_at <= truck.time:
-                    truck.load(pkg)
-                else:
-                    all_pkgs_loaded = False
-            if all_pkgs_loaded:
-                map.locations[loc].routed = True
-                if available_locs.__contains__(loc):
-                    available_locs.remove(loc)
-                else:
-                    unavailable_locs.remove(loc)    # Remove clustered pkg w/ no deltime, marked as unavailable
-
-        # If it's not clustered, add all undelivered packages and make location unavailable
-        else:
-            for pkg in pkgs.loc_dictionary[loc]:
-                pkg = pkgs.lookup(pkg)
-                if pkg.ready_at and pkg.ready_at > truck.time:
-                    raise Exception("Loaded package that was unavailable!")
-                # Check status and update if needed
-                if pkg.status != "At Warehouse":
-                    stat = pkg.status
-                    if type(stat) == str:
-                        if stat.__contains__("Truck") or stat.__contains__(":"):
-                            truck.load(pkg)
-                        else:
-                            raise Exception("Package #", pkg.id, "has a bad status: ", pkg.status)
-                    elif type(stat) == list:
-                        truck.load(pkg)
-                    else:
-                        raise Exception("Package #", pkg.id, "has a bad status: ", pkg.status)
-                else:
-                    truck.load(pkg)
-            map.locations[loc].routed = True
-            available_locs.remove(loc)
-
-    # print("Loaded truck", truck.id, "with", route.overview(), "\n")
-    top_groups.remove(route)
-    return route
-
-
-# Launches the trucks on their route, keeping track of the time as they go
-# Big-O: O(n^3)
-def simulate(status_time):
-    clock = timedelta(days=99)
-    t_clock = 0     # Which truck has the earliest clock
-
-    # Have all trucks drive, then take the min of truck times
-    for truck in trucks:
-        pkg = truck.packages[0]
-        truck.drive(pkg.loc)
-        if truck.time < clock:
-            clock = truck.time
-            t_clock = truck.id
-
-    # Have truck with earliest time deliver and start driving to next delivery    # O(n^3)
-    while clock != timedelta(days=99) and clock < status_time:
-
-        # Deliver all packages in our truck's location
-        truck = trucks[t_clock - 1]
-        pkg = None
-        if truck.packages:
-            pkg = truck.packages[0]
-        # Unload each package on the truck; O(n)
-        while truck.packages and truck.loc == pkg.loc:
-            # Check for package #9, which has the wrong address
-            if pkg.id == 9 and pkg.loc == 12:
-                pkg = truck.packages.pop(0)
-                pkgs.loc_dictionary[pkg.loc].remove(pkg.id)
-                pkg.loc = None  # Ensures that pkg will not be delivered until address is updated
-                pkg.ready_at = timedelta(days=99)
-                truck.load(pkg)  # Put package at end of list, truck will drop it off at hub
-            else:
-                truck.unload()
-                pkgs.loc_dictionary[pkg.loc].remove(pkg.id)
-            if truck.packages:
-                pkg = truck.packages[0]
-
-        # If truck is empty, or if it needs to return a package
-        if len(truck.packages) == 0 or truck.packages[0].loc is None:
-
-            # Go back to warehouse
-            if truck.loc != 0:
-                truck.drive(0)
-
-            # If at the warehouse
-            else:
-                # See if the truck has brought a package back; O(n)
-                if truck.packages:
-                    for pkg in truck.packages:
-                        # print("\nDropped off Package #", pkg.id, "at hub due to bad address")
-                        pkg.status = "At Warehouse"
-                    truck.packages = []
-
-                # Check if more deliveries need to be made
-                if unavailable_locs or available_locs:
-                    # Try to reload & drive
-                    if create_route(truck):
-                        print(clock)
-                        pkg = truck.packages[0]
-                        truck.drive(pkg.loc)
-                    # If you can't, wait for available packages
-                    elif unavailable_locs:
-                        truck.time = checkup_time
-                    # If there are no more packages, finished
-                    else:
-                        truck.time = timedelta(days=99)
-
-                # End of day
-                else:
-                    truck.time = timedelta(days=99)
-
-        # Drive to next package's location
+        scenario.setup("End of Day")
+    result = {"settings": config, "results": scenario.results(), "timings": dict(scenario.timings),
+              "statuses": None, "stats": stats.to_dict() if stats else None, "scenario": scenario}
+    if times:
+        started = perf_counter()
+        result["statuses"] = scenario.statuses(times)
+        result["timings"]["statuses"] = perf_counter() - started
+    return result
+
+
+# Parses a clock time from the command line ("10:15 am" or "10:15" on a 24 hour clock) into seconds; O(1)
+def parse_time(value):
+    seconds = time_seconds(value.strip())
+    if seconds is None:
+        raise argparse.ArgumentTypeError("not a time: " + value)
+    return seconds
+
+
+# The command line entry point: runs one day with the given settings and writes its totals and phase timings (and the
+# statuses at any --time) as JSON, or as CSV. Nothing is asked of the user
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan and simulate a WGUPS delivery day without the menu")
+    parser.add_argument("--trucks", type=int, default=num_trucks, help="number of trucks")
+    parser.add_argument("--speed", type=float, default=truck_speed, help="truck speed in mph")
+    parser.add_argument("--capacity", type=int, default=max_packages, help="packages per truck")
+    parser.add_argument("--start", type=parse_time, default=start_time, help='start time, e.g. "8:00 am"')
+    parser.add_argument("--pkg-file", default=pkg_file, help="package manifest (XLSX, CSV or JSONL)")
+    parser.add_argument("--distance-file", default=distance_file, help="distance table (XLSX or CSV)")
+    parser.add_argument("--improve", action="store_true", default=improve_routes, help="run 2-opt/Or-opt on routes")
+    parser.add_argument("--exact", action="store_true", default=exact_routes, help="solve small routes exactly")
+    parser.add_argument("--updates", help="mid-day package updates to apply (CSV or JSONL), e.g. \"WGUPS Updates.csv\"")
+    parser.add_argument("--lenient", action="store_true", help="record late deliveries instead of stopping")
+    parser.add_argument("--time", type=parse_time, action="append", default=[],
+                        help='a time to report every package\'s status at, e.g. "10:15 am" (repeatable)')
+    parser.add_argument("--stats", action="store_true", help="record function timings and hot call counts")
+    parser.add_argument("--profile", action="store_true", help="also capture a cProfile report (implies --stats)")
+    parser.add_argument("--format", choices=("json", "csv"), default="json", help="output format")
+    parser.add_argument("--output", help="file to write to (default: standard output)")
+    args = parser.parse_args(argv)
+
+    stats = Stats(profile=args.profile) if args.stats or args.profile else None
+    result = run(args.time, not args.lenient, stats, num_trucks=args.trucks, truck_speed=args.speed,
+                 max_packages=args.capacity, start_time=args.start, pkg_file=args.pkg_file,
+                 distance_file=args.distance_file, improve_routes=args.improve, exact_routes=args.exact,
+                 updates=load_updates_file(args.updates) if args.updates else updates)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            statuses = result["statuses"]
+            json.dump({"settings": result["settings"], "results": result["results"], "timings": result["timings"],
+                       "stats": result["stats"], "statuses": list(statuses.rows()) if statuses is not None else []},
+                      out, indent=2)
+            out.write("\n")
+        elif result["statuses"] is not None:
+            # The status rows are the CSV, so the timings (and stats) go to standard error
+            result["statuses"].to_csv(out)
+            print(json.dumps({"timings": result["timings"], "stats": result["stats"]}), file=sys.stderr)
         else:
-            pkg = truck.packages[0]
-            if pkg.loc:
-                truck.drive(pkg.loc)
-            else:
-                truck.drive(0)
-
-        # Configure clock
-        clock = timedelta(days=99)
-        for truck in trucks:
-            if truck.time < clock:
-                clock = truck.time
-                t_clock = truck.id
-
-        # Update Pkg #9's address at 10:20 am
-        if timedelta(hours=10, minutes=20) <= clock and (not pkgs.lookup(9).loc or pkgs.lookup(9).loc == 12):
-            loc = map.lookup("410 S State St", "84111")
-            if loc == -1:
-                raise Exception("Bad address given!")
-            pkg = pkgs.lookup(9)
-            pkg.loc = loc
-            pkgs.loc_dictionary[loc].append(pkg.id)
-            pkg.ready_at = None
-            loc = map.locations[loc]
-            loc.routed = False
-            if not available_locs.__contains__(loc.id):
-                available_locs.append(loc.id)
-            if pkg.status.__contains__("On Truck"):
-                t = int(pkg.status[9:9])
-                # Check if the truck with Pkg 9 is currently in transit (not held by 'truck')
-                if trucks[t - 1] != truck:
-                    truck = trucks[truck - 1]
-                group_pkgs(truck)   # O(n^3)
-            # print("\nUpdated address for Pkg 9, ready for delivery\n")
-            group_locs(clock)
-
-        # Check for package updates (arrived at hub or address update)
-        if checkup_time <= clock:
-            group_locs(checkup_time)
-    return
-
-
-# A method for re-routing a truck while it's already making deliveries
-# Big-O: O(n^3)
-def group_pkgs(truck):
-    locs = []
-    for pkg in truck.packages:
-        if not locs.__contains__(pkg.loc):
-            locs.append(pkg.loc)
-    group = group_shortest_edges(locs, True)    # O(n^3)
-    group.make_path(truck.loc, map)             # O(n log n)
-    for loc in group.locs:
-        for pkg in pkgs.loc_dictionary[loc]:
-            truck.packages.append(pkgs.lookup(pkg))
+            row = dict(result["settings"])
+            row.update(result["results"])
+            row.update(("seconds_" + phase, seconds) for phase, seconds in result["timings"].items())
+            if stats:
+                functions = result["stats"]["functions"]
+                row.update(("seconds_" + name + "()", functions[name]["seconds"]) for name in functions)
+                row.update(result["stats"]["counters"])
+                if result["stats"]["profile"]:
+                    print(result["stats"]["profile"], file=sys.stderr)
+            writer = csv.writer(out)
+            writer.writerow(row)
+            writer.writerow(row.values())
+    finally:
+        if out is not sys.stdout:
+            out.close()
 
 
 # * * * * *   Main Menu   * * * * * #
@@ -773,27 +176,35 @@ def group_pkgs(truck):
 #   1.  Provide screenshots to show package status of all packages at a time between 8:35 a.m. and 9:25 a.m.
 #   2.  Provide screenshots to show package status of all packages at a time between 9:35 a.m. and 10:25 a.m.
 #   3.  Provide screenshots to show package status of all packages at a time between 12:03 p.m. and 1:12 p.m.
-selection = -1
-while selection != 0:
-    print("* * * WGUPS Simulator * * *\n"
-          "Please make a selection:\n"
-          "\t1. Run full simulation\n"
-          "\t2. Show package statuses at a time\n"
-          "\t0. Exit")
-    try:
-        selection = int(input())
-    except:
-        print("\n\n\nBad choice, try again")
-        continue
+def menu():
+    selection = -1
+    while selection != 0:
+        print("* * * WGUPS Simulator * * *\n"
+              "Please make a selection:\n"
+              "\t1. Run full simulation\n"
+              "\t2. Show package statuses at a time\n"
+              "\t0. Exit")
+        try:
+            selection = int(input())
+        except:
+            print("\n\n\nBad choice, try again")
+            continue
+
+        if selection == 1:
+            setup("End of Day")
+        elif selection == 2:
+            print("Please input the time by hour and minute.\n"
+                  "Hour:\t", end='')
+            hour = int(input())
+            print("Minute:\t", end='')
+            minute = int(input())
+            setup(hour * 3600 + minute * 60)
+        else:
+            continue
+
 
-    if selection == 1:
-        setup("End of Day")
-    elif selection == 2:
-        print("Please input the time by hour and minute.\n"
-              "Hour:\t", end='')
-        hour = int(input())
-        print("Minute:\t", end='')
-        minute = int(input())
-        setup(timedelta(hours=hour, minutes=minute))
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
     else:
-        continue
+        menu()
@@ -0,0 +1,71 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_generator.py:    Regression tests for generated days: cities and manifests that used to break the planner, the
+#                       benchmark's run_size, and that a City only replaces the map while it's in use
+
+from WGUPS_Objects import Map
+from WGUPS_Generator import City, make_manifest
+from WGUPS_Scenario import Scenario
+from WGUPS_Bench import run_size
+import main
+import unittest
+
+# (seed, packages, locations, trucks, packages per truck) of generated days that each failed once: with a package
+# loaded twice, a location held at the hub with nothing to deliver, or a routed location still queued
+broken_days = [(1, 40, 14, 4, 16), (2, 20, 7, 2, 16), (14, 20, 7, 4, 16), (31, 20, 7, 3, 16), (222, 20, 7, 2, 24),
+               (254, 60, 21, 4, 24)]
+
+
+class TestGeneratedDays(unittest.TestCase):
+    def tearDown(self):
+        Map.use_builtin()
+
+    def test_broken_days(self):
+        for seed, num_pkgs, num_locs, num_trucks, capacity in broken_days:
+            with self.subTest(seed=seed):
+                city = City(num_locs, seed)
+                manifest = make_manifest(city, num_pkgs, seed)
+                scenario = Scenario(num_trucks=num_trucks, max_packages=capacity, manifest=manifest, strict=False,
+                                    verbose=False, city=city).setup("End of Day")
+                self.assertEqual(scenario.results()["undelivered"], 0)
+                delivered = sorted(pkg for truck, pkg, loc, time, miles in scenario.deliveries)
+                self.assertEqual(delivered, list(range(1, num_pkgs + 1)))
+
+    # A location with more packages than a truck holds is turned down before the day starts
+    def test_too_many_packages_at_a_location(self):
+        city = City(7, 2)
+        manifest = make_manifest(city, 20, 2)
+        with self.assertRaises(Exception) as caught:
+            Scenario(max_packages=2, manifest=manifest, verbose=False, city=city).setup("End of Day")
+        self.assertIn("more than a truck can carry", str(caught.exception))
+
+    def test_run_size(self):
+        record = run_size(50, seed=1)
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["results"]["undelivered"], 0)
+        self.assertIs(Map.locations, Map.builtin_locations)
+
+
+class TestCity(unittest.TestCase):
+    def tearDown(self):
+        Map.use_builtin()
+
+    # A city used for a block puts the previous map back after it
+    def test_with_city(self):
+        Map.use_builtin()
+        matrix = Map.matrix
+        with City(30, 1) as city:
+            self.assertEqual(Map.size, 30)
+            self.assertIs(Map.locations, city.locations)
+        self.assertIs(Map.matrix, matrix)
+        self.assertIs(Map.locations, Map.builtin_locations)
+
+    # A city left in use doesn't change the next Salt Lake City day
+    def test_run_after_use(self):
+        City(30, 1).use()
+        self.assertEqual(main.run()["results"]["total_miles"], 120.8)
+
+
+if __name__ == "__main__":
+    unittest.main()
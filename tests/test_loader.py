@@ -0,0 +1,65 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_loader.py:   Tests for the package, distance table and update loaders, and that a day without a distance file
+#                   goes back to the built-in map
+
+from WGUPS_Objects import Map, PkgHashTable, load_pkgs, slc_updates
+from WGUPS_Loader import load_pkg_file, load_distance_file, load_updates_file
+import main
+import os
+import tempfile
+import unittest
+
+folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+pkg_file = os.path.join(folder, "WGUPS Package File.xlsx")
+distance_file = os.path.join(folder, "WGUPS Distance Table.xlsx")
+updates_file = os.path.join(folder, "WGUPS Updates.csv")
+
+
+class TestLoaders(unittest.TestCase):
+    def tearDown(self):
+        Map.use_builtin()
+
+    # The spreadsheet's packages are the built-in ones
+    def test_pkg_file(self):
+        loaded = PkgHashTable(16)
+        self.assertEqual(load_pkg_file(loaded, pkg_file, report=False), 40)
+        built_in = PkgHashTable(16)
+        load_pkgs(built_in)
+        for pkg in built_in:
+            other = loaded.lookup(pkg.id)
+            self.assertEqual((other.loc, other.deadline, other.mass, other.truck, other.ready),
+                             (pkg.loc, pkg.deadline, pkg.mass, pkg.truck, pkg.ready))
+
+    # Every built-in address is found in the spreadsheet's table, and the cache gives back the same table
+    def test_distance_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for source in ("parsed", "cached"):
+                self.assertEqual(load_distance_file(distance_file, cache_dir, report=False), 27, source)
+                self.assertEqual([Map().lookup(loc.address, loc.zip) for loc in Map.builtin_locations],
+                                 list(range(27)))
+                self.assertAlmostEqual(Map.distances[26][1], 13.0)
+
+    def test_updates_file(self):
+        self.assertEqual(load_updates_file(updates_file), slc_updates)
+
+
+class TestMapReset(unittest.TestCase):
+    # A day loaded from the spreadsheets doesn't leave their map in use for the next day
+    def test_run_after_distance_file(self):
+        result = main.run(distance_file=distance_file, pkg_file=pkg_file, updates=load_updates_file(updates_file))
+        self.assertEqual(result["results"]["total_miles"], 120.76)
+        self.assertEqual(main.run()["results"]["total_miles"], 120.8)
+        self.assertIs(Map.locations, Map.builtin_locations)
+
+    # Putting the built-in map back when it's already in use keeps the caches made for it
+    def test_use_builtin_keeps_version(self):
+        Map.use_builtin()
+        version = Map.version
+        Map.use_builtin()
+        self.assertEqual(Map.version, version)
+
+
+if __name__ == "__main__":
+    unittest.main()
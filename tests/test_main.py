@@ -0,0 +1,59 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_main.py:     Regression tests for the headless entry point: the Salt Lake City day's totals, from run() and from
+#                   the command line
+
+from WGUPS_Objects import time_seconds
+import main
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestRun(unittest.TestCase):
+    # The built-in day, with its package 9 correction, is delivered on time in 120.8 miles
+    def test_day_total(self):
+        results = main.run()["results"]
+        self.assertEqual(results["total_miles"], 120.8)
+        self.assertEqual(results["late_packages"], 0)
+        self.assertEqual(results["undelivered"], 0)
+
+    def test_improved_day_total(self):
+        results = main.run(improve_routes=True, exact_routes=True)["results"]
+        self.assertEqual(results["total_miles"], 106.8)
+        self.assertEqual(results["late_packages"], 0)
+
+    def test_every_package_delivered_once(self):
+        scenario = main.run()["scenario"]
+        delivered = [pkg for truck, pkg, loc, time, miles in scenario.deliveries]
+        self.assertEqual(sorted(delivered), list(range(1, 41)))
+
+    # Package 9 is corrected at 10:20, so it's at the hub with its new location then, and delivered there later
+    def test_package_9_correction(self):
+        result = main.run(times=[time_seconds("10:20 am")])
+        row = [row for row in result["statuses"].rows() if row["id"] == 9][0]
+        self.assertEqual((row["loc"], row["status"]), (19, "At Warehouse"))
+        deliveries = [entry for entry in result["scenario"].deliveries if entry[1] == 9]
+        self.assertEqual(deliveries[0][2], 19)
+        self.assertGreater(deliveries[0][3], time_seconds("10:20 am"))
+
+    def test_unknown_setting(self):
+        with self.assertRaises(Exception):
+            main.run(num_truck=3)
+
+
+class TestCommandLine(unittest.TestCase):
+    def test_json_output(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "day.json")
+            main.main(["--trucks", "2", "--time", "10:25 am", "--output", path])
+            with open(path) as file:
+                day = json.load(file)
+        self.assertEqual(day["results"]["total_miles"], 120.8)
+        self.assertEqual(len(day["statuses"]), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_routing.py:  Tests for route improvement and the exact solver, on the built-in map
+
+from WGUPS_Objects import Map
+from WGUPS_Routing import solve_exact, improve_path, path_lateness, path_miles
+from itertools import permutations
+import unittest
+
+start_time = 8 * 3600
+speed = 18.0
+
+
+class TestRouting(unittest.TestCase):
+    def setUp(self):
+        Map.use_builtin()
+        Map.reset_locations()
+
+    def tearDown(self):
+        Map.reset_locations()
+
+    # Without deadlines, the exact route is the shortest of every order of the stops
+    def test_exact_is_shortest(self):
+        stops = [5, 9, 2, 19, 12, 25]
+        best = min(path_miles([0] + list(order) + [0]) for order in permutations(stops))
+        route = solve_exact(stops, 0, speed, start_time)
+        self.assertEqual(sorted(route), sorted(stops))
+        self.assertAlmostEqual(path_miles([0] + route + [0]), best)
+
+    # A memoized route comes back as a new list each time
+    def test_exact_returns_a_copy(self):
+        route = solve_exact([5, 9, 2, 19], 0, speed, start_time)
+        route.append(99)
+        self.assertNotIn(99, solve_exact([5, 9, 2, 19], 0, speed, start_time))
+
+    def test_improve_keeps_stops(self):
+        path = [26, 1, 21, 6, 24, 3, 20]
+        improved = improve_path(path, 0, speed, start_time, budget=1.0)
+        self.assertEqual(sorted(improved), sorted(path))
+        self.assertLessEqual(path_miles([0] + improved + [0]), path_miles([0] + path + [0]))
+
+    # Lateness is counted in the whole seconds that a truck takes to drive each leg (at 17 mph, a leg's seconds aren't
+    # whole numbers until they're rounded)
+    def test_lateness_in_whole_seconds(self):
+        seq = [0, 5, 9]
+        travel = Map.travel_times(17.0)
+        arrives = start_time + travel[0][5] + travel[5][9]
+        Map.locations[9].add_deadline(arrives)
+        self.assertEqual(path_lateness(seq, 17.0, start_time), 0)
+        Map.reset_locations()
+        Map.locations[9].add_deadline(arrives - 1)
+        self.assertEqual(path_lateness(seq, 17.0, start_time), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_stats.py:    Tests for the optional instrumentation: probe counts while a Stats is started, and that nothing is
+#                   left patched (or counted) after it stops
+
+from WGUPS_Objects import PkgHashTable
+from WGUPS_Scenario import Scenario
+from WGUPS_Stats import Stats, chain_lengths
+import unittest
+
+
+# A table whose ids all start in the same slot, so each one probes one more slot than the last
+def colliding_table(count=10):
+    table = PkgHashTable(64)
+    for i in range(count):
+        table.insert(i * 128 + 1, "195 W Oakland Ave", "Salt Lake City", "84115", "EOD", 1)
+    return table
+
+
+class TestStats(unittest.TestCase):
+    def test_chain_lengths(self):
+        table = colliding_table()
+        self.assertEqual(sum(chain_lengths(table).values()), 10)
+        self.assertGreater(max(chain_lengths(table)), 1)
+
+    def test_lookup_probes(self):
+        table = colliding_table()
+        longest = max(chain_lengths(table))
+        with Stats() as stats:
+            for id in table.ids:
+                table.lookup(id)
+        self.assertEqual(stats.counters["lookups"], 10)
+        self.assertEqual(stats.counters["longest_probe"], longest)
+
+    # The table's own probe doesn't count anything, and is put back when the stats stop
+    def test_unpatched(self):
+        probe = PkgHashTable.__dict__["probe"]
+        with Stats():
+            self.assertIsNot(PkgHashTable.__dict__["probe"], probe)
+        self.assertIs(PkgHashTable.__dict__["probe"], probe)
+        self.assertFalse(hasattr(colliding_table(), "collisions"))
+
+    def test_run(self):
+        stats = Stats()
+        scenario = stats.run(Scenario(verbose=False, updates=[]))
+        self.assertEqual(set(stats.phases), {"load", "cluster", "group", "route", "simulate"})
+        self.assertEqual(stats.chain_lengths, chain_lengths(scenario.pkgs))
+        self.assertGreater(stats.counters["lookups"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
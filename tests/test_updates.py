@@ -0,0 +1,62 @@
+# Author:       Wesley Lancaster
+# StudentID:    #001356953
+# Date:         September 2020
+# test_updates.py:  Tests for mid-day package updates: the feed a day is given, cancellations and delays, and stale
+#                   updates that come in after their package is gone
+
+from WGUPS_Objects import time_seconds, slc_updates
+from WGUPS_Scenario import Scenario
+import unittest
+
+
+# Runs the built-in packages with the given updates, and returns the finished scenario
+def run_day(updates, strict=True):
+    return Scenario(verbose=False, strict=strict, updates=updates).setup("End of Day")
+
+
+class TestUpdates(unittest.TestCase):
+    # A day is only given the updates passed to it, so without the correction package 9 goes to its listed address
+    def test_only_given_updates(self):
+        scenario = run_day([])
+        self.assertEqual(scenario.feed, [])
+        self.assertEqual(scenario.pkgs.lookup(9).loc, 12)
+        self.assertEqual(run_day(slc_updates).pkgs.lookup(9).loc, 19)
+
+    def test_cancel(self):
+        scenario = run_day(slc_updates + [(time_seconds("8:00 am"), "cancel", 4)])
+        self.assertNotIn(4, [pkg for truck, pkg, loc, time, miles in scenario.deliveries])
+        self.assertEqual(scenario.results()["cancelled"], 1)
+        self.assertEqual(scenario.results()["undelivered"], 0)
+
+    def test_delay(self):
+        scenario = run_day(slc_updates + [(time_seconds("8:00 am"), "delay", 2, time_seconds("11:00 am"))])
+        delivered = [time for truck, pkg, loc, time, miles in scenario.deliveries if pkg == 2]
+        self.assertGreaterEqual(delivered[0], time_seconds("11:00 am"))
+
+    def test_unknown_update(self):
+        with self.assertRaises(Exception):
+            run_day([(time_seconds("9:00 am"), "reroute", 2)])
+
+
+class TestStaleUpdates(unittest.TestCase):
+    # Package 1 is delivered by 9:30, so a delay for it then is too late
+    stale = [(time_seconds("9:30 am"), "delay", 1, time_seconds("11:00 am"))]
+
+    def test_skipped_when_not_strict(self):
+        scenario = run_day(slc_updates + self.stale, strict=False)
+        self.assertEqual([update[:3] for update in scenario.stale_updates], [(time_seconds("9:30 am"), "delay", 1)])
+        self.assertEqual(scenario.results()["total_miles"], 120.8)
+
+    def test_raised_when_strict(self):
+        with self.assertRaises(Exception):
+            run_day(slc_updates + self.stale)
+
+    # A delay for a package that's already left the hub
+    def test_delay_on_truck(self):
+        scenario = run_day(slc_updates + [(time_seconds("8:05 am"), "delay", 15, time_seconds("11:00 am"))], False)
+        self.assertEqual(len(scenario.stale_updates), 1)
+        self.assertIn("on a truck", scenario.stale_updates[0][3])
+
+
+if __name__ == "__main__":
+    unittest.main()